@@ -0,0 +1,135 @@
+"""
+Бенчмарк задержки обработки конкурентных slash-команд:
+синхронный DatabaseManager прямо в корутине против AsyncDatabaseManager.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_async_db --reports 50000 --commands 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone, timedelta
+
+from core.async_database import AsyncDatabaseManager
+from core.database_sqlite import DatabaseManager
+
+GUILD_ID = 1
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def fill_database(path: str, reports: int) -> None:
+    db = DatabaseManager(path)
+    now = datetime.now(timezone.utc)
+    for i in range(reports):
+        db.save_report({
+            "guild_id": GUILD_ID,
+            "contract_name": f"Контракт {i % 11}",
+            "author_id": random.randint(1, 500),
+            "author_name": f"user{random.randint(1, 500)}",
+            "participants": [f"user{random.randint(1, 500)}" for _ in range(random.randint(1, 6))],
+            "amount": 100000,
+            "fund": 50000,
+            "per_user": 10000,
+            "timestamp": (now - timedelta(minutes=random.randint(0, 60 * 24 * 30))).isoformat()
+        })
+    db.close()
+
+
+async def handle_command(db, blocking: bool, user_id: int, kind: str):
+    """Имитация обработчика команды: язык пользователя + основной запрос"""
+    if blocking:
+        db.get_user_language(GUILD_ID, user_id)
+        if kind == "reportdays":
+            db.get_reports_by_days(GUILD_ID, 30)
+        elif kind == "language":
+            db.set_user_language(GUILD_ID, user_id, "ua")
+    else:
+        await db.get_user_language(GUILD_ID, user_id)
+        if kind == "reportdays":
+            await db.get_reports_by_days(GUILD_ID, 30)
+        elif kind == "language":
+            await db.set_user_language(GUILD_ID, user_id, "ua")
+
+
+async def run_scenario(db, blocking: bool, commands: int, interval: float):
+    loop = asyncio.get_running_loop()
+    dispatch, total, tasks = [], [], []
+    lag = []
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        # Как heartbeat gateway: должен просыпаться каждые 10 мс
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag.append(time.perf_counter() - start - 0.01)
+
+    async def interaction(arrived: float, index: int):
+        dispatch.append(time.perf_counter() - arrived)
+        kind = ("reportdays", "info", "language", "info")[index % 4]
+        await handle_command(db, blocking, index, kind)
+        total.append(time.perf_counter() - arrived)
+
+    hb = asyncio.create_task(heartbeat())
+    # Взаимодействия приходят по расписанию независимо от того, занят ли loop:
+    # задержка считается от планового времени прихода
+    start = time.perf_counter()
+    for i in range(commands):
+        arrived = start + i * interval
+        delay = arrived - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(loop.create_task(interaction(arrived, i)))
+    await asyncio.gather(*tasks)
+    stop.set()
+    await hb
+    return dispatch, total, lag
+
+
+def report(name, dispatch, total, lag):
+    ms = lambda v: f"{v * 1000:8.1f} ms"
+    print(f"\n{name}")
+    print(f"  задержка до старта обработчика: p50 {ms(percentile(dispatch, 50))}  p99 {ms(percentile(dispatch, 99))}")
+    print(f"  полное время команды:           p50 {ms(percentile(total, 50))}  p99 {ms(percentile(total, 99))}")
+    print(f"  лаг event loop (heartbeat):     avg {ms(statistics.mean(lag))}  max {ms(max(lag))}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=50000)
+    parser.add_argument("--commands", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.002, help="интервал между взаимодействиями, с")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite")
+        print(f"Заполнение базы: {args.reports} отчётов...")
+        fill_database(path, args.reports)
+
+        sync_db = DatabaseManager(path)
+        report("Блокирующий DatabaseManager", *asyncio.run(
+            run_scenario(sync_db, True, args.commands, args.interval)))
+        sync_db.close()
+
+        async def run_async():
+            async_db = AsyncDatabaseManager(path)
+            try:
+                await async_db.start()
+                return await run_scenario(async_db, False, args.commands, args.interval)
+            finally:
+                async_db.close()
+
+        report("AsyncDatabaseManager", *asyncio.run(run_async()))
+
+
+if __name__ == "__main__":
+    main()
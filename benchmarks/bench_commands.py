@@ -0,0 +1,337 @@
+"""
+Нагрузочная модель команд бота без сети: настоящие обработчики из main.py вызываются
+с поддельными discord.Interaction, а база заполняется воспроизводимыми данными.
+
+Данные: контракты из contracts.json, --users игроков (популярность по Парето),
+--reports отчётов за последние --days дней (вечерний пик, 1–10 участников
+с реалистичным распределением размера отряда, небольшое число частых лидеров).
+
+Сценарии (по --iterations вызовов, --concurrency одновременно):
+    report            /report — выбор контракта
+    participant_flow  select контракта -> кнопка «Добавить участников» -> UserSelect (сохраняет отчёт)
+    reportdays        /reportdays за 1, 7 или 30 дней
+    reportdays_page   кнопка ▶ в ответе /reportdays
+    cleanreportsday   /cleanreportsday за случайный день
+    cleanreports      /cleanreports (последним: удаляет данные)
+Для каждого — p50/p95/p99/среднее (мс), пропускная способность (вызовов/с), ошибки и defer'ы.
+Результат пишется в JSON (--output), --compare печатает разницу с прошлым прогоном.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_commands --reports 50000 --output bench_commands.json
+    python -m benchmarks.bench_commands --reports 50000 --compare bench_commands.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+
+from benchmarks.bench_report_writes import percentile
+from tests.fakes import GUILD_ID, FakeChannel, FakeInteraction
+
+# Размер отряда: 1..10 участников, чаще всего 3–4
+SQUAD_SIZE_WEIGHTS = (6, 14, 20, 20, 15, 10, 6, 4, 3, 2)
+# Активность по часам суток (UTC): ночью почти никого, пик вечером
+HOUR_WEIGHTS = (2, 1, 1, 1, 1, 1, 2, 3, 4, 5, 6, 6, 7, 7, 7, 8, 9, 11, 13, 14, 14, 12, 8, 4)
+NICKNAMES = ("Wolf", "Сокіл", "Ворон", "Bear", "Лис", "Shadow", "Гром", "Frost", "Рись", "Storm")
+
+
+# --- Данные ---
+def make_users(rnd: random.Random, count: int) -> list:
+    users = [SimpleNamespace(id=100000 + i, display_name=f"{rnd.choice(NICKNAMES)}_{i}") for i in range(count)]
+    for user in users:
+        user.weight = rnd.paretovariate(1.2)
+    return users
+
+
+def pick_squad(rnd: random.Random, users: list, weights: list) -> list:
+    size = min(len(users), rnd.choices(range(1, len(SQUAD_SIZE_WEIGHTS) + 1), SQUAD_SIZE_WEIGHTS)[0])
+    squad = {}
+    while len(squad) < size:
+        user = rnd.choices(users, weights)[0]
+        squad[user.id] = user
+    return list(squad.values())
+
+
+def make_reports(rnd: random.Random, contracts: list, users: list, count: int, days: int) -> list:
+    weights = [u.weight for u in users]
+    leaders = rnd.sample(users, max(1, len(users) // 10))
+    leader_weights = [u.weight for u in leaders]
+    now = datetime.now(timezone.utc)
+    reports = []
+    for _ in range(count):
+        day = now - timedelta(days=rnd.randrange(days))
+        moment = day.replace(hour=rnd.choices(range(24), HOUR_WEIGHTS)[0],
+                             minute=rnd.randrange(60), second=rnd.randrange(60))
+        if moment > now:
+            moment -= timedelta(days=1)
+        contract = rnd.choice(contracts)
+        squad = pick_squad(rnd, users, weights)
+        leader = rnd.choices(leaders, leader_weights)[0]
+        fund = contract["amount"] * 0.5
+        reports.append({
+            "guild_id": GUILD_ID,
+            "contract_name": contract["name"],
+            "author_id": leader.id,
+            "author_name": leader.display_name,
+            "participants": [u.display_name for u in squad],
+            "participant_ids": [u.id for u in squad],
+            "amount": contract["amount"],
+            "fund": fund,
+            "per_user": (contract["amount"] - fund) / len(squad),
+            "timestamp": moment.isoformat()
+        })
+    return reports
+
+
+def admin(user):
+    return SimpleNamespace(id=user.id, display_name=user.display_name,
+                           guild_permissions=SimpleNamespace(administrator=True))
+
+
+async def route(factory, view, interaction, values=None):
+    """Маршрутизация нажатия по custom_id, как у add_dynamic_items: шаблон -> from_custom_id -> callback"""
+    base = view.children[0]
+    match = factory.__discord_ui_compiled_template__.fullmatch(base.custom_id)
+    item = await factory.from_custom_id(interaction, base, match)
+    if values is not None:
+        item.item._values = values
+    await item.callback(interaction)
+
+
+# --- Сценарии ---
+class Scenarios:
+    def __init__(self, bot_module, rnd: random.Random, users: list, contracts: list, days: int, latency: float):
+        self.main = bot_module
+        self.rnd = rnd
+        self.users = users
+        self.weights = [u.weight for u in users]
+        self.contracts = contracts
+        self.days = days
+        self.latency = latency
+        self.channel = FakeChannel(latency)
+
+    def interaction(self, component: bool = False, is_admin: bool = False) -> FakeInteraction:
+        user = self.rnd.choices(self.users, self.weights)[0]
+        return FakeInteraction(admin(user) if is_admin else user, self.channel, self.latency, component)
+
+    async def report(self):
+        interaction = self.interaction()
+        await self.main.report.callback(interaction)
+        return interaction
+
+    async def participant_flow(self):
+        interaction = await self.report()
+        select = FakeInteraction(interaction.user, self.channel, self.latency, component=True)
+        await route(self.main.ContractSelect, interaction.last_view(), select,
+                    [self.rnd.choice(self.contracts)["name"]])
+        button = FakeInteraction(interaction.user, self.channel, self.latency, component=True)
+        await route(self.main.AddParticipantsButton, select.last_view(), button)
+        users = FakeInteraction(interaction.user, self.channel, self.latency, component=True)
+        await route(self.main.ParticipantSelect, button.last_view(), users,
+                    pick_squad(self.rnd, self.users, self.weights))
+        return users
+
+    async def reportdays(self):
+        interaction = self.interaction(is_admin=True)
+        await self.main.report_days.callback(interaction, days=self.rnd.choice((1, 7, 30)))
+        return interaction
+
+    async def open_reportdays(self):
+        """Подготовка reportdays_page (вне замера): ответ /reportdays со второй страницей"""
+        interaction = self.interaction(is_admin=True)
+        await self.main.report_days.callback(interaction, days=30)
+        view = interaction.last_view()
+        return view if view is not None and view.has_next else None
+
+    async def reportdays_page(self, view):
+        interaction = self.interaction(component=True, is_admin=True)
+        await view.next_button.callback(interaction)
+        return interaction
+
+    async def cleanreportsday(self):
+        interaction = self.interaction(is_admin=True)
+        day = datetime.now(timezone.utc) - timedelta(days=self.rnd.randrange(self.days))
+        await self.main.clean_reports_day.callback(interaction, date=day.strftime("%Y-%m-%d"))
+        return interaction
+
+    async def cleanreports(self):
+        interaction = self.interaction(is_admin=True)
+        await self.main.clean_reports.callback(interaction, days=self.rnd.randint(20, self.main.Config.MAX_REPORT_DAYS))
+        return interaction
+
+
+async def measure(name: str, call, iterations: int, concurrency: int, prepare=None) -> dict:
+    latencies, errors, unanswered = [], 0, 0
+    queue = asyncio.Queue()
+    for _ in range(iterations):
+        queue.put_nowait(await prepare() if prepare is not None else None)
+
+    async def worker():
+        nonlocal errors, unanswered
+        while not queue.empty():
+            arg = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                interaction = await (call(arg) if prepare is not None else call())
+            except Exception as e:
+                errors += 1
+                if errors == 1:
+                    print(f"  ⚠️ {name}: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            latencies.append(time.perf_counter() - start)
+            if not interaction.replies:
+                unanswered += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "unanswered": unanswered,
+        "throughput_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args) -> dict:
+    # База и файлы выбираются через окружение до импорта main (Config читает его при импорте)
+    import main as bot_module
+    from core.database_sqlite import parse_contracts
+
+    db = bot_module.db
+    rnd = random.Random(args.seed)
+    with open(bot_module.Config.CONTRACTS_JSON_PATH, "r", encoding="utf-8") as f:
+        contracts = [{"name": n, "amount": a} for n, a in parse_contracts(json.load(f)).items()]
+    users = make_users(rnd, args.users)
+
+    await db.start()
+    try:
+        await bot_module.contracts.load()
+        start = time.perf_counter()
+        for report in make_reports(rnd, contracts, users, args.reports, args.days):
+            await db.save_report(report)
+        for user in rnd.sample(users, len(users) // 3):
+            await db.set_user_language(GUILD_ID, user.id, "ua")
+        await db.flush()
+        fill_seconds = time.perf_counter() - start
+        print(f"Заполнение: {args.reports} отчётов, {args.users} игроков за {fill_seconds:.1f} с", file=sys.stderr)
+
+        scenarios = Scenarios(bot_module, rnd, users, contracts, args.days, args.latency_ms / 1000)
+        plan = [
+            ("report", scenarios.report, None),
+            ("participant_flow", scenarios.participant_flow, None),
+            ("reportdays", scenarios.reportdays, None),
+            ("reportdays_page", scenarios.reportdays_page, scenarios.open_reportdays),
+            ("cleanreportsday", scenarios.cleanreportsday, None),
+            ("cleanreports", scenarios.cleanreports, None),
+        ]
+        results = {}
+        for name, call, prepare in plan:
+            if args.only and name not in args.only:
+                continue
+            if prepare is not None:
+                sample = await prepare()
+                if sample is None:
+                    print(f"  {name}: пропущен (в /reportdays одна страница)", file=sys.stderr)
+                    continue
+            results[name] = await measure(name, call, args.iterations, args.concurrency, prepare)
+        deferrals = bot_module.instrumentation.deferrals
+        for name, result in results.items():
+            result["deferrals"] = int(deferrals.value(command=name))
+        await db.flush()
+    finally:
+        await db.aclose()
+        db.close()
+
+    return {
+        "meta": {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "backend": bot_module.Config.DATABASE_BACKEND,
+            "seed": args.seed,
+            "users": args.users,
+            "reports": args.reports,
+            "days": args.days,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "latency_ms": args.latency_ms,
+            "fill_seconds": round(fill_seconds, 3),
+        },
+        "scenarios": results,
+    }
+
+
+COMPARABLE = ("backend", "users", "reports", "days", "iterations", "concurrency", "latency_ms")
+
+
+def print_results(result: dict, baseline: dict = None) -> None:
+    if baseline is not None:
+        differs = [k for k in COMPARABLE if baseline.get("meta", {}).get(k) != result["meta"][k]]
+        if differs:
+            print(f"⚠️ Параметры прогонов отличаются: {', '.join(differs)}")
+    print(f"{'сценарий':<18} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'выз/с':>9} {'ошибки':>7}")
+    for name, row in result["scenarios"].items():
+        line = (f"{name:<18} {row['p50_ms'] or 0:9.2f} {row['p95_ms'] or 0:9.2f} {row['p99_ms'] or 0:9.2f} "
+                f"{row['throughput_per_s']:9.0f} {row['errors']:7d}")
+        old = (baseline or {}).get("scenarios", {}).get(name)
+        if old and old.get("p95_ms") and row["p95_ms"] and old.get("throughput_per_s"):
+            line += (f"   p95 {(row['p95_ms'] / old['p95_ms'] - 1) * 100:+6.1f}%"
+                     f"  выз/с {(row['throughput_per_s'] / old['throughput_per_s'] - 1) * 100:+6.1f}%")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--reports", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=30, help="за сколько дней генерировать отчёты")
+    parser.add_argument("--iterations", type=int, default=200, help="вызовов каждого сценария")
+    parser.add_argument("--concurrency", type=int, default=10, help="одновременных вызовов")
+    parser.add_argument("--latency-ms", type=float, default=0, help="имитация задержки Discord API на вызов")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="*", help="запустить только эти сценарии")
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("DATABASE_BACKEND", "sqlite")
+        if os.environ["DATABASE_BACKEND"] == "sqlite":
+            os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.sqlite")
+        result = asyncio.run(run(args))
+
+    print_results(result, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Результаты: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
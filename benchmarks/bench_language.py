@@ -0,0 +1,71 @@
+"""
+Микро-бенчмарк рендера отчёта: старый путь (get_text + str.format на каждый вызов)
+против проверенных при загрузке шаблонов LanguageManager.render.
+
+Выигрыш каталога — проверка плейсхолдеров при загрузке, а не скорость рендера:
+Template.render — это str.format_map того же рядка, то есть наравне со str.format,
+а LanguageManager.render добавляет к нему сборку **values и выбор шаблона (порядка 1 мкс).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_language --number 200000
+"""
+import argparse
+import json
+import os
+import timeit
+
+from core.instrumentation import Span, _current_span
+from core.language import LanguageManager
+
+REPORT_VALUES = {
+    "name": "Лісовий кодекс 2",
+    "amount": 165000.0,
+    "leader": "Castello",
+    "participants": "• Alpha\n• Bravo\n• Charlie",
+    "fund": "82500.00",
+    "per_user": "27500.00",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    manager = LanguageManager()
+    base_path = os.path.join(os.path.dirname(__file__), "..", "languages")
+    with open(os.path.join(base_path, "ua.json"), "r", encoding="utf-8") as f:
+        legacy = {"ua": json.load(f)}
+
+    def legacy_render():
+        # Как старый get_text: две выборки из словарей и разбор формата при каждом вызове
+        return legacy.get("ua", {}).get("report_template").format(**REPORT_VALUES)
+
+    def compiled_render():
+        return manager.render("report_template", "ua", **REPORT_VALUES)
+
+    template = manager.template("report_template", "ua")
+
+    def template_render():
+        # Шаблон, уже выбранный из каталога: только сам рендер
+        return template.render(REPORT_VALUES)
+
+    assert legacy_render() == compiled_render() == template_render()
+    for name, func, span in (
+        ("get_text + str.format", legacy_render, None),
+        ("LanguageManager.render", compiled_render, None),
+        # Внутри замера команды, как в боте: рендер засекает время фазы render
+        ("  в замере команды", compiled_render, Span("bench")),
+        ("Template.render", template_render, None),
+    ):
+        token = _current_span.set(span)
+        try:
+            seconds = min(timeit.repeat(func, number=args.number, repeat=3))
+        finally:
+            _current_span.reset(token)
+        print(f"  {name:<24} {seconds / args.number * 1e9:8.0f} ns на отчёт")
+    print("Рендер наравне со str.format: выигрыш шаблонов — проверка плейсхолдеров при загрузке")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Бенчмарк пропускной способности сохранения отчётов (отчётов в секунду):
+синхронный save_report с коммитом на каждый отчёт против отложенной пакетной записи.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_report_writes --reports 5000 --squads 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from core.async_database import AsyncDatabaseManager
+from core.database_sqlite import DatabaseManager
+from tests.fakes import make_report
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_sync(path: str, reports):
+    db = DatabaseManager(path)
+    acks = []
+    start = time.perf_counter()
+    for report in reports:
+        t = time.perf_counter()
+        db.save_report(report)
+        acks.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed, acks
+
+
+async def run_async(path: str, reports, squads: int, batch_size: int, flush_delay: float):
+    db = AsyncDatabaseManager(path, batch_size=batch_size, flush_delay=flush_delay)
+    await db.start()
+    acks = []
+
+    async def squad(chunk):
+        for report in chunk:
+            t = time.perf_counter()
+            await db.save_report(report)
+            acks.append(time.perf_counter() - t)
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(squad(reports[i::squads]) for i in range(squads)))
+    await db.flush()
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed, acks
+
+
+def print_result(name: str, count: int, elapsed: float, acks) -> None:
+    print(f"  {name:<34} {count / elapsed:10.0f} отчётов/с   "
+          f"ответ p50 {percentile(acks, 50) * 1e6:8.1f} µs  p99 {percentile(acks, 99) * 1e6:8.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=5000)
+    parser.add_argument("--squads", type=int, default=20, help="сколько отрядов сдают отчёты одновременно")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--flush-delay-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    reports = [make_report(rnd) for _ in range(args.reports)]
+    print(f"{args.reports} отчётов, {args.squads} отрядов параллельно")
+    with tempfile.TemporaryDirectory() as tmp:
+        print_result("DatabaseManager.save_report", args.reports,
+                     *run_sync(os.path.join(tmp, "sync.sqlite"), reports))
+        print_result("по одному отчёту (batch_size=1)", args.reports, *asyncio.run(
+            run_async(os.path.join(tmp, "single.sqlite"), reports, args.squads, 1, 0)))
+        print_result(f"write-behind (batch_size={args.batch_size})", args.reports, *asyncio.run(
+            run_async(os.path.join(tmp, "batched.sqlite"), reports, args.squads,
+                      args.batch_size, args.flush_delay_ms / 1000)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Бенчмарк /reportdays: старая схема (JSON в TEXT, без индексов) против текущей.
+Старый путь — как в прежнем обработчике: все отчёты окна читаются и суммируются в Python.
+Новый — то, что делает /reportdays сейчас: summarize_reports и первая страница
+get_participant_earnings_page. Старая база мигрируется на месте тем же DatabaseManager,
+время миграции тоже выводится.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_reportdays_schema --sizes 10000 100000 1000000 --days 1 30
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timezone, timedelta
+
+from config import Config
+from core.database_sqlite import DatabaseManager, LEGACY_GUILD_ID
+
+HISTORY_DAYS = 365
+
+
+def create_legacy_database(path: str, reports: int) -> None:
+    """Схема и формат данных до миграции: участники — JSON-строка"""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE contracts (name TEXT PRIMARY KEY, amount REAL NOT NULL)
+    """)
+    conn.execute("""
+        CREATE TABLE reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            contract_name TEXT NOT NULL,
+            author_id INTEGER NOT NULL,
+            author_name TEXT NOT NULL,
+            participants TEXT NOT NULL,
+            amount REAL NOT NULL,
+            fund REAL NOT NULL,
+            per_user REAL NOT NULL,
+            timestamp TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, language TEXT DEFAULT 'ru')")
+    now = datetime.now(timezone.utc)
+    rnd = random.Random(42)
+
+    # Отчёты пишутся в хронологическом порядке, поэтому id растёт вместе с timestamp
+    offsets = sorted((rnd.randint(0, HISTORY_DAYS * 86400) for _ in range(reports)), reverse=True)
+
+    def rows():
+        for i, offset in enumerate(offsets):
+            participants = [f"user{rnd.randint(1, 2000)}" for _ in range(rnd.randint(1, 6))]
+            yield (
+                f"Контракт {i % 11}", rnd.randint(1, 2000), f"user{rnd.randint(1, 2000)}",
+                json.dumps(participants, ensure_ascii=False),
+                100000, 50000, 50000 / len(participants),
+                (now - timedelta(seconds=offset)).isoformat()
+            )
+
+    with conn:
+        conn.executemany("""
+            INSERT INTO reports (contract_name, author_id, author_name, participants, amount, fund, per_user, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows())
+    conn.close()
+
+
+def legacy_get_reports_by_days(conn: sqlite3.Connection, days: int):
+    """Точная копия старого DatabaseManager.get_reports_by_days"""
+    cutoff_iso = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    cursor = conn.execute("SELECT * FROM reports WHERE timestamp >= ?", (cutoff_iso,))
+    reports = []
+    for row in cursor.fetchall():
+        report = dict(row)
+        report["participants"] = json.loads(report["participants"])
+        reports.append(report)
+    return reports
+
+
+def legacy_report_days(conn: sqlite3.Connection, days: int) -> str:
+    """Расчёт старого обработчика /reportdays: итоги и заработки всех участников"""
+    reports = legacy_get_reports_by_days(conn, days)
+    total_amount = sum(r["amount"] for r in reports)
+    total_fund = sum(r["fund"] for r in reports)
+    total_payout = sum(r["per_user"] * len(r["participants"]) for r in reports)
+    earnings = {}
+    for r in reports:
+        for p in r["participants"]:
+            earnings[p] = earnings.get(p, 0) + r["per_user"]
+    earnings_text = "\n".join(f"• {user}: {amount:.2f} USD" for user, amount in earnings.items())
+    return f"{total_amount} {total_fund} {total_payout}\n{earnings_text}"
+
+
+def report_days(db: DatabaseManager, days: int):
+    """Текущий /reportdays: итоги окна и первая страница заработков (как ReportDaysView.load)"""
+    until = datetime.now(timezone.utc)
+    since = until - timedelta(days=days)
+    summary = db.summarize_reports(LEGACY_GUILD_ID, since, until)
+    rows = db.get_participant_earnings_page(LEGACY_GUILD_ID, since, until,
+                                            limit=Config.REPORT_DAYS_PAGE_SIZE + 1)
+    return summary, rows
+
+
+def best_of(func, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(size: int, days_list) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite")
+        create_legacy_database(path, size)
+
+        legacy = sqlite3.connect(path)
+        legacy.row_factory = sqlite3.Row
+        legacy_times = {days: best_of(lambda: legacy_report_days(legacy, days)) for days in days_list}
+        legacy.close()
+
+        start = time.perf_counter()
+        db = DatabaseManager(path)
+        migration = time.perf_counter() - start
+        new_times = {days: best_of(lambda: report_days(db, days)) for days in days_list}
+        db.close()
+
+    print(f"\n{size} отчётов (миграция на месте: {migration:.2f} s)")
+    for days in days_list:
+        old, new = legacy_times[days], new_times[days]
+        print(f"  /reportdays {days:>2} дн.: старая схема {old * 1000:9.1f} ms, "
+              f"новая {new * 1000:9.1f} ms, x{old / new:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 30])
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Бенчмарк холодного старта: время от запуска процесса до обработки первого взаимодействия.
+
+Каждый прогон — новый процесс интерпретатора (пустая база во временной папке, HTTP-сервер
+на свободном порту): импорт main, критичная часть setup_hook (start_core_services),
+затем /report через поддельный Interaction из bench_commands. Подключения к gateway нет,
+поэтому этап ready не измеряется; синхронизация команд в боте всё равно идёт после него.
+Печатает медиану и разброс по этапам StartupClock и полное время жизни процесса.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_startup --runs 10 --output bench_startup.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+STAGES = ("imported", "setup_hook", "first_interaction")
+
+
+async def child() -> dict:
+    import main
+    from tests.fakes import FakeChannel, FakeInteraction
+    from types import SimpleNamespace
+
+    try:
+        await main.start_core_services()
+        main.startup.mark("setup_hook")
+        user = SimpleNamespace(id=1, display_name="bench")
+        await main.report.callback(FakeInteraction(user, FakeChannel(0), 0))
+        return dict(main.startup.marks)
+    finally:
+        await main.health_server.stop()
+        await main.db.aclose()
+        main.db.close()
+
+
+def run_once(tmp: str, index: int) -> dict:
+    env = dict(os.environ, DATABASE_PATH=os.path.join(tmp, f"startup-{index}.sqlite"), PORT="0")
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    marks = json.loads(output.strip().splitlines()[-1])
+    marks["process_exit"] = time.perf_counter() - start
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child())))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [run_once(tmp, i) for i in range(args.runs)]
+    result = {}
+    print(f"{'этап':<20} {'медиана, с':>11} {'мин':>8} {'макс':>8}")
+    for stage in (*STAGES, "process_exit"):
+        values = [run[stage] for run in runs if stage in run]
+        result[stage] = {
+            "median": round(statistics.median(values), 4),
+            "min": round(min(values), 4),
+            "max": round(max(values), 4),
+        }
+        print(f"{stage:<20} {result[stage]['median']:11.3f} {result[stage]['min']:8.3f} {result[stage]['max']:8.3f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"runs": args.runs, "stages": result}, f, ensure_ascii=False, indent=2)
+        print(f"Результаты: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Нагрузочный бенчмарк записи отчётов из нескольких процессов бота (шардов) в одно хранилище:
+суммарная пропускная способность (отчётов в секунду) при 1, 2, 4… процессах-писателях.
+
+Каждый процесс открывает своё хранилище (как отдельный шард), ждёт общего старта
+и сдаёт свою долю отчётов из --squads конкурентных корутин. SQLite-писатели разных
+процессов по очереди берут блокировку файла; PostgreSQL пишет параллельно, так что
+рост с числом процессов ограничен ядрами, общими для сервера и писателей.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_storage_writers --reports 20000 --processes 1,2,4
+    python -m benchmarks.bench_storage_writers --backend postgres --dsn postgresql://localhost/castello_bench
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_report_writes import percentile
+from tests.fakes import make_report
+from core.database_sqlite import DatabaseManager
+from core.storage import Storage
+
+
+def open_storage(args, path: str) -> Storage:
+    if args.backend == "postgres":
+        from core.database_postgres import PostgresStorage
+        return PostgresStorage(args.dsn, min_size=args.squads, max_size=args.squads)
+    from core.async_database import AsyncDatabaseManager
+    return AsyncDatabaseManager(path, readers=1)
+
+
+async def write_share(args, path: str, reports, barrier) -> list:
+    db = open_storage(args, path)
+    await db.start()
+    acks = []
+
+    async def squad(chunk):
+        for report in chunk:
+            t = time.perf_counter()
+            await db.save_report(report)
+            acks.append(time.perf_counter() - t)
+            await asyncio.sleep(0)
+
+    try:
+        # Подключение и схема не входят в замер: все процессы стартуют одновременно
+        await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+        await asyncio.gather(*(squad(reports[i::args.squads]) for i in range(args.squads)))
+        await db.flush()
+    finally:
+        await db.aclose()
+        db.close()
+    return acks
+
+
+def writer(args, path: str, seed: int, count: int, barrier, results) -> None:
+    rnd = random.Random(seed)
+    reports = [make_report(rnd) for _ in range(count)]
+    results.put(asyncio.run(write_share(args, path, reports, barrier)))
+
+
+def run(args, path: str, processes: int):
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(processes + 1)
+    results = ctx.Queue()
+    share = args.reports // processes
+    workers = [
+        ctx.Process(target=writer, args=(args, path, 42 + i, share, barrier, results))
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    acks = []
+    for _ in workers:
+        acks.extend(results.get())
+    elapsed = time.perf_counter() - start
+    for worker in workers:
+        worker.join()
+    return share * processes, elapsed, acks
+
+
+async def reset_postgres(dsn: str) -> None:
+    import asyncpg
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute("DROP TABLE IF EXISTS report_participants, reports")
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument("--dsn", help="DATABASE_URL для --backend postgres (таблицы отчётов пересоздаются)")
+    parser.add_argument("--reports", type=int, default=20000, help="всего отчётов на один прогон")
+    parser.add_argument("--processes", default="1,2,4", help="число процессов-писателей через запятую")
+    parser.add_argument("--squads", type=int, default=8, help="конкурентных отрядов в каждом процессе")
+    args = parser.parse_args()
+    if args.backend == "postgres" and not args.dsn:
+        parser.error("для --backend postgres нужен --dsn")
+
+    print(f"{args.backend}: {args.reports} отчётов, {args.squads} отрядов на процесс")
+    with tempfile.TemporaryDirectory() as tmp:
+        for processes in (int(p) for p in args.processes.split(",")):
+            path = os.path.join(tmp, f"writers-{processes}.sqlite")
+            if args.backend == "postgres":
+                asyncio.run(reset_postgres(args.dsn))
+            else:
+                # Схему создаём заранее, чтобы процессы не выполняли миграции наперегонки
+                DatabaseManager(path).close()
+            count, elapsed, acks = run(args, path, processes)
+            print(f"  {processes} процесс(а/ов) {count / elapsed:10.0f} отчётов/с   "
+                  f"ответ p50 {percentile(acks, 50) * 1e3:8.2f} ms  p99 {percentile(acks, 99) * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
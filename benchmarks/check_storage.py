@@ -0,0 +1,291 @@
+"""
+Проверка соответствия бэкендов хранилища интерфейсу Storage.
+
+Один сценарий (контракты, языки, отчёты за несколько месяцев на двух серверах, сводки,
+keyset-страницы, удаление по дате и сроку хранения) прогоняется на каждом бэкенде,
+а результаты сверяются с эталонной моделью на чистом Python.
+SQLite проверяется всегда (во временной папке), PostgreSQL — если передан --postgres
+(нужны пакет asyncpg и пустая база: таблицы сценария очищаются).
+
+Запуск из корня репозитория:
+    python -m benchmarks.check_storage
+    python -m benchmarks.check_storage --postgres postgresql://localhost/castello_test
+Код возврата 1, если хоть одна проверка не прошла.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timezone, timedelta
+
+from core.async_database import AsyncDatabaseManager
+from core.storage import Storage
+
+GUILDS = (1, 2)
+NAMES = ["alice", "Bob", "bob", "Łukasz", "Юля", "zed", "Anna", "anna", "Émile", "1st"]
+SUMMARY_KEYS = ("reports", "total_amount", "total_fund", "total_payout")
+GROUP_KEYS = ("key", "label", "reports", "amount", "fund", "payout")
+
+
+def make_reports(rnd: random.Random, now: datetime, count: int) -> list:
+    reports = []
+    for _ in range(count):
+        size = rnd.choice((1, 1, 2, 3, 3, 4, 6))
+        ids = rnd.sample(range(len(NAMES)), size)
+        amount = float(rnd.choice((50000, 100000, 125000)))
+        author = rnd.randrange(len(NAMES))
+        reports.append({
+            "guild_id": rnd.choice(GUILDS),
+            "contract_name": rnd.choice(("Контракт A", "Контракт B", "contract c")),
+            "author_id": 1000 + author,
+            "author_name": NAMES[author],
+            "participants": [NAMES[i] for i in ids],
+            "participant_ids": [1000 + i for i in ids],
+            "amount": amount,
+            "fund": amount / 2,
+            "per_user": amount / 2 / size,
+            "timestamp": (now - timedelta(minutes=rnd.randint(0, 120 * 24 * 60))).isoformat()
+        })
+    return reports
+
+
+class Reference:
+    """Эталон: те же запросы по списку отчётов в памяти"""
+
+    def __init__(self):
+        self.reports = []
+
+    def window(self, guild_id, since, until):
+        since_iso = since.astimezone(timezone.utc).isoformat()
+        until_iso = until.astimezone(timezone.utc).isoformat() if until is not None else None
+        return [r for r in self.reports if r["guild_id"] == guild_id and r["timestamp"] >= since_iso
+                and (until_iso is None or r["timestamp"] < until_iso)]
+
+    def reports_by_days(self, guild_id, days):
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        return self.window(guild_id, since, None)
+
+    def summarize(self, guild_id, since, until, group_by):
+        rows = self.window(guild_id, since, until)
+        summary = {
+            "reports": len(rows),
+            "total_amount": sum(r["amount"] for r in rows),
+            "total_fund": sum(r["fund"] for r in rows),
+            "total_payout": sum(r["per_user"] * len(r["participants"]) for r in rows),
+            "groups": []
+        }
+        if group_by is None or not rows:
+            return summary
+        groups = {}
+        for r in rows:
+            if group_by == "participant":
+                items = [(name, name, r["per_user"]) for name in r["participants"]]
+            elif group_by == "day":
+                items = [(r["timestamp"][:10], r["timestamp"][:10], r["per_user"] * len(r["participants"]))]
+            elif group_by == "contract":
+                items = [(r["contract_name"], r["contract_name"], r["per_user"] * len(r["participants"]))]
+            else:
+                items = [(r["author_id"], r["author_name"], r["per_user"] * len(r["participants"]))]
+            for key, label, payout in items:
+                group = groups.setdefault(key, {"key": key, "label": label, "reports": 0,
+                                                "amount": 0.0, "fund": 0.0, "payout": 0.0})
+                group["label"] = max(group["label"], label)
+                group["reports"] += 1
+                group["amount"] += r["amount"]
+                group["fund"] += r["fund"]
+                group["payout"] += payout
+        # Бинарный порядок строк: как COLLATE "C" и сравнение строк в SQLite (UTF-8 == порядок кодовых точек)
+        summary["groups"] = [groups[key] for key in sorted(groups)]
+        return summary
+
+    def earnings(self, guild_id, since, until):
+        groups = self.summarize(guild_id, since, until, "participant")["groups"]
+        return [{"key": g["key"], "reports": g["reports"], "payout": g["payout"]} for g in groups]
+
+    def delete(self, predicate) -> int:
+        before = len(self.reports)
+        self.reports = [r for r in self.reports if not predicate(r)]
+        return before - len(self.reports)
+
+
+class Checker:
+    def __init__(self, backend: str):
+        self.backend = backend
+        self.failures = 0
+        self.checks = 0
+
+    def check(self, name: str, actual, expected) -> None:
+        self.checks += 1
+        if not same(actual, expected):
+            self.failures += 1
+            print(f"  ❌ [{self.backend}] {name}\n     получено: {short(actual)}\n     ожидалось: {short(expected)}")
+
+
+def same(a, b) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        return isinstance(a, (int, float)) and isinstance(b, (int, float)) and math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def short(value) -> str:
+    text = repr(value)
+    return text if len(text) < 400 else text[:400] + "…"
+
+
+def report_view(report: dict) -> tuple:
+    """Отчёт без id (у бэкендов свои последовательности); участники — в порядке (user_id, имя)"""
+    pairs = sorted(zip(report["participant_ids"], report["participants"]), key=lambda p: (p[0], p[1]))
+    return (report["guild_id"], report["contract_name"], report["author_id"], report["author_name"],
+            report["amount"], report["fund"], report["per_user"], report["timestamp"], pairs)
+
+
+async def scenario(db: Storage, checker: Checker, tmp: str, reports: int, seed: int) -> None:
+    ref = Reference()
+    rnd = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    check = checker.check
+
+    # --- Контракты ---
+    path = os.path.join(tmp, f"contracts-{checker.backend}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"name": "Контракт A", "amount": 100000}, {"name": "Контракт B", "amount": 50000}], f)
+    changes = await db.load_contracts_from_file(GUILDS[0], path)
+    check("contracts: первая загрузка", changes, {"added": ["Контракт A", "Контракт B"], "updated": [], "removed": []})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"name": "Контракт A", "amount": 125000}, {"name": "contract c", "amount": 1}], f)
+    changes = await db.load_contracts_from_file(GUILDS[0], path)
+    check("contracts: изменения", changes, {"added": ["contract c"], "updated": ["Контракт A"], "removed": ["Контракт B"]})
+    check("contracts: get_contract_by_name", await db.get_contract_by_name(GUILDS[0], "Контракт A"),
+          {"name": "Контракт A", "amount": 125000.0})
+    check("contracts: другой сервер", await db.get_contract_by_name(GUILDS[1], "Контракт A"), None)
+    check("contracts: get_all_contracts", sorted((c["name"], c["amount"]) for c in await db.get_all_contracts(GUILDS[0])),
+          [("contract c", 1.0), ("Контракт A", 125000.0)])
+    check("contracts: отсутствующий файл", await db.load_contracts_from_file(GUILDS[1], path + ".missing"),
+          {"added": [], "updated": [], "removed": []})
+
+    # --- Языки ---
+    check("language: по умолчанию", await db.find_user_language(GUILDS[0], 7), None)
+    await db.store_user_language(0, 7, "ua")
+    check("language: выбор до серверов", await db.find_user_language(GUILDS[0], 7), "ua")
+    await db.store_user_language(GUILDS[0], 7, "ru")
+    check("language: выбор на сервере", await db.find_user_language(GUILDS[0], 7), "ru")
+    check("language: другой сервер", await db.find_user_language(GUILDS[1], 7), "ua")
+    await db.set_user_language(GUILDS[1], 8, "ua")
+    check("language: set/get через кеш", await db.get_user_language(GUILDS[1], 8), "ua")
+
+    # --- Отчёты ---
+    for report in make_reports(rnd, now, reports):
+        await db.save_report(report)
+        ref.reports.append(report)
+    await db.flush()
+
+    async def compare_reads(stage: str) -> None:
+        for guild_id in GUILDS:
+            for days in (1, 30, 200):
+                actual = sorted(report_view(r) for r in await db.get_reports_by_days(guild_id, days))
+                expected = sorted(report_view(r) for r in ref.reports_by_days(guild_id, days))
+                check(f"{stage}: get_reports_by_days({guild_id}, {days})", actual, expected)
+            midday = (now - timedelta(days=45)).replace(hour=13, minute=37)
+            windows = [
+                (now - timedelta(days=7), None),
+                (midday, now - timedelta(days=10, hours=5)),
+                (midday, midday + timedelta(hours=3)),
+                (now - timedelta(days=400), now + timedelta(days=1)),
+            ]
+            for since, until in windows:
+                for group_by in (None, "day", "contract", "leader", "participant"):
+                    actual = await db.summarize_reports(guild_id, since, until, group_by)
+                    expected = ref.summarize(guild_id, since, until, group_by)
+                    check(f"{stage}: summarize_reports({guild_id}, {since:%m-%d %H:%M}, "
+                          f"{until and f'{until:%m-%d %H:%M}'}, {group_by})",
+                          {k: actual[k] for k in SUMMARY_KEYS}, {k: expected[k] for k in SUMMARY_KEYS})
+                    check(f"{stage}: группы {group_by}", [{k: g[k] for k in GROUP_KEYS} for g in actual["groups"]],
+                          expected["groups"])
+                expected = ref.earnings(guild_id, since, until)
+                pages, after = [], None
+                while True:
+                    page = await db.get_participant_earnings_page(guild_id, since, until, after=after, limit=3)
+                    pages.extend(page)
+                    if len(page) < 3:
+                        break
+                    after = page[-1]["key"]
+                check(f"{stage}: страницы вперёд ({guild_id})", pages, expected)
+                if expected:
+                    page = await db.get_participant_earnings_page(guild_id, since, until,
+                                                                  before=expected[-1]["key"], limit=3)
+                    check(f"{stage}: страница назад ({guild_id})", page, expected[-4:-1])
+
+    await compare_reads("после записи")
+
+    # --- Удаление ---
+    day = (now - timedelta(days=3)).date().isoformat()
+    deleted = await db.delete_reports_by_date(GUILDS[0], day)
+    check("delete_reports_by_date", deleted,
+          ref.delete(lambda r: r["guild_id"] == GUILDS[0] and r["timestamp"][:10] == day))
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=50)).isoformat()
+    deleted = await db.delete_reports_older_than(GUILDS[1], 50)
+    check("delete_reports_older_than(сервер)", deleted,
+          ref.delete(lambda r: r["guild_id"] == GUILDS[1] and r["timestamp"] < cutoff))
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=80)).isoformat()
+    deleted = await db.delete_reports_older_than(None, 80)
+    check("delete_reports_older_than(все)", deleted, ref.delete(lambda r: r["timestamp"] < cutoff))
+
+    await compare_reads("после удаления")
+
+    # SQLite переносит в архив всё старше прошлого месяца: результаты чтений не должны измениться
+    result = await db.maintain(archive_after_months=1)
+    check("maintain: формат", sorted(result), ["archived", "dropped", "vacuumed"])
+    await compare_reads("после обслуживания")
+
+
+async def run_backend(name: str, db: Storage, tmp: str, reports: int, seed: int) -> Checker:
+    checker = Checker(name)
+    await db.start()
+    try:
+        await scenario(db, checker, tmp, reports, seed)
+    finally:
+        await db.aclose()
+        db.close()
+    status = "✅" if not checker.failures else "❌"
+    print(f"{status} {name}: {checker.checks - checker.failures}/{checker.checks} проверок")
+    return checker
+
+
+async def reset_postgres(dsn: str) -> None:
+    import asyncpg
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute("DROP TABLE IF EXISTS report_participants, reports, users, contracts")
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--postgres", metavar="DSN", help="проверить и PostgreSQL (таблицы в базе пересоздаются)")
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AsyncDatabaseManager(os.path.join(tmp, "check.sqlite"), batch_size=16)
+        failures += asyncio.run(run_backend("sqlite", db, tmp, args.reports, args.seed)).failures
+        if args.postgres:
+            from core.database_postgres import PostgresStorage
+            asyncio.run(reset_postgres(args.postgres))
+            db = PostgresStorage(args.postgres)
+            failures += asyncio.run(run_backend("postgres", db, tmp, args.reports, args.seed)).failures
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,17 @@ class Config:
     # Токен бота из переменных окружения (.env или Render settings)
     DISCORD_BOT_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 
+    # Шардирование (AutoShardedBot): общее число шардов и шарды этого процесса ("0,1").
+    # Не заданы — Discord сам выбирает число шардов, и все они работают в одном процессе
+    SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+    SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS").split(",")] if os.getenv("SHARD_IDS") else None
+
+    # Режим разработки: команды синхронизируются только на этот сервер (обновляются сразу)
+    DEV_GUILD_ID = int(os.getenv("DEV_GUILD_ID")) if os.getenv("DEV_GUILD_ID") else None
+
+    # Синхронизация дерева команд без изменений пропускается; COMMAND_SYNC_FORCE=1 — отправить всё равно
+    COMMAND_SYNC_FORCE = os.getenv("COMMAND_SYNC_FORCE") == "1"
+
     # Язык по умолчанию и поддерживаемые языки
     DEFAULT_LANGUAGE = "ru"
     SUPPORTED_LANGUAGES = ["ru", "ua"]
@@ -14,9 +25,21 @@ class Config:
     # Максимум контрактов в select-меню
     MAX_CONTRACTS_DISPLAY = 25
 
-    # Настройки Flask (для Render / UptimeRobot)
+    # Выбор участников отчёта (лимит Discord для select-меню — 25)
+    MAX_REPORT_PARTICIPANTS = 25
+
+    # HTTP-сервер health-check (для Render / Cloudflare worker)
     HOST = "0.0.0.0"
-    PORT = 8080
+    PORT = int(os.getenv("PORT", "8080"))
+
+    # Лаг event loop (сек), начиная с которого /healthz отвечает "degraded"
+    HEALTH_MAX_LOOP_LAG_SECONDS = 1.0
+
+    # Задержка heartbeat gateway (сек), начиная с которой /healthz отвечает "degraded"
+    HEALTH_MAX_GATEWAY_LATENCY_SECONDS = 5.0
+
+    # Если команда не ответила за столько секунд (лимит Discord — 3), ответ откладывается через defer
+    INTERACTION_DEFER_AFTER_SECONDS = 2.0
 
     # Настройки отчёта за дни
     DEFAULT_REPORT_DAYS = 1    # Минимум 1 день для отчётов
@@ -25,8 +48,60 @@ class Config:
     # Очистка старых отчётов по команде /cleanreports (дефолт 7 дней)
     REPORT_CLEANUP_DAYS = 7
 
-    # Путь к JSON-файлу с системными контрактами
+    # Путь к JSON-файлу с системными контрактами (общий каталог для всех серверов)
     CONTRACTS_JSON_PATH = "contracts.json"
 
+    # Папка с собственными каталогами серверов: <guild_id>.json заменяет общий каталог на этом сервере
+    CONTRACTS_GUILD_DIR = "contracts"
+
     # Минимальный интервал между обновлениями контрактов в минутах (опционально)
     CONTRACTS_RELOAD_COOLDOWN_MINUTES = 10
+
+    # Хранилище: "sqlite" (один процесс, файл DATABASE_PATH) или "postgres"
+    # (общая база для нескольких процессов/шардов по DATABASE_URL, нужен пакет asyncpg)
+    DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "sqlite")
+    DATABASE_URL = os.getenv("DATABASE_URL")
+
+    # Размер пула соединений PostgreSQL
+    DB_POOL_MIN_SIZE = 2
+    DB_POOL_MAX_SIZE = 10
+
+    # Путь к файлу базы данных SQLite
+    DATABASE_PATH = os.getenv("DATABASE_PATH", "database.sqlite")
+
+    # Хеш последнего отправленного в Discord дерева команд (рядом с базой, чтобы переживать перезапуски)
+    COMMAND_TREE_HASH_PATH = os.getenv(
+        "COMMAND_TREE_HASH_PATH", os.path.join(os.path.dirname(DATABASE_PATH), "command_tree.json")
+    )
+
+    # Количество read-only соединений в пуле читателей БД
+    DB_READER_POOL_SIZE = 4
+
+    # Отчёты хранятся помесячными партициями; месяцы старше стольких месяцев
+    # переносятся в файл архива рядом с базой (database.archive.sqlite)
+    REPORT_ARCHIVE_AFTER_MONTHS = 3
+
+    # Срок хранения отчётов всех серверов в днях: при обслуживании БД старые месяцы
+    # удаляются целыми партициями. Без REPORT_RETENTION_DAYS отчёты хранятся бессрочно
+    REPORT_RETENTION_DAYS = int(os.getenv("REPORT_RETENTION_DAYS")) if os.getenv("REPORT_RETENTION_DAYS") else None
+
+    # Как часто (в часах) запускать обслуживание БД: архивирование, ANALYZE, VACUUM
+    DB_MAINTENANCE_INTERVAL_HOURS = 24
+
+    # Как часто (в секундах) проверять изменения файла контрактов
+    CONTRACTS_WATCH_INTERVAL_SECONDS = 30
+
+    # Отложенная запись отчётов: размер пачки и максимальная задержка сброса (мс)
+    REPORT_BATCH_SIZE = 50
+    REPORT_FLUSH_DELAY_MS = 20
+
+    # Повтор незаписанных отчётов: первая задержка и потолок экспоненциального роста (сек)
+    REPORT_RETRY_DELAY_SECONDS = 1
+    REPORT_RETRY_MAX_DELAY_SECONDS = 60
+
+    # Кеш языков пользователей: максимум записей и время жизни записи (сек)
+    USER_LANGUAGE_CACHE_SIZE = 10000
+    USER_LANGUAGE_CACHE_TTL_SECONDS = 3600
+
+    # Сколько участников показывать на одной странице /reportdays
+    REPORT_DAYS_PAGE_SIZE = 20
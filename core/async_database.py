@@ -0,0 +1,305 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from datetime import datetime
+from typing import List, Optional, Set, Dict, Any, Callable
+
+from core.database_sqlite import DatabaseManager, default_archive_path
+from core.instrumentation import phase
+from core.storage import Storage
+
+
+class AsyncDatabaseManager(Storage):
+    """
+    Хранилище на SQLite: асинхронный фасад над DatabaseManager с теми же методами.
+    Все записи выполняются в одном выделенном потоке-писателе,
+    чтения — в небольшом пуле read-only соединений (WAL).
+    Обработчики команд только await'ят результат, event loop не блокируется на диске.
+
+    Отчёты пишутся отложенно (write-behind): save_report сразу возвращает управление,
+    а очередь сбрасывается пачкой по размеру batch_size или через flush_delay секунд.
+    Чтения отчётов и любые другие записи сначала сбрасывают очередь, поэтому порядок
+    сохраняется, а сводки никогда не отстают от сохранённых отчётов.
+
+    Отчёт, который не удалось записать, не теряется: он остаётся в очереди повторов
+    и пишется снова с экспоненциальной задержкой (retry_delay … max_retry_delay).
+    Что не записалось и при закрытии, сохраняется в файл <db_path>.unsaved.jsonl
+    и возвращается в очередь при следующем start().
+
+    Компромисс очереди повторов: чтения её не ждут (иначе при сбое БД зависли бы все
+    команды), поэтому сводки отстают на эти отчёты — retrying_reports_for() говорит,
+    на сколько, и /reportdays помечает сводку неполной. Id отчёт получает при записи,
+    так что повторённый отчёт получит id больше, чем более новые; порядок по времени
+    (timestamp, по которому сортируют чтения) при этом сохраняется.
+    """
+
+    def __init__(self, db_path: str = "database.sqlite", readers: int = 4,
+                 batch_size: int = 50, flush_delay: float = 0.02,
+                 language_cache_size: int = 10000, language_cache_ttl: float = 3600,
+                 archive_path: Optional[str] = None,
+                 retry_delay: float = 1.0, max_retry_delay: float = 60.0):
+        super().__init__(language_cache_size, language_cache_ttl)
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_delay = flush_delay
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.unsaved_path = f"{db_path}.unsaved.jsonl"
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Отчёты, запись которых не удалась, и таймер следующей попытки.
+        # _failed пополняет поток-писатель, в event loop они переходят в _retrying
+        self._failed: List[Dict[str, Any]] = []
+        self._failed_lock = threading.Lock()
+        self._retrying: List[Dict[str, Any]] = []
+        self._retry_handle: Optional[asyncio.TimerHandle] = None
+        self._retry_attempt = 0
+        self._inflight: Set[asyncio.Future] = set()
+        self._inflight_reports = 0
+        self.archive_path = archive_path or default_archive_path(db_path)
+        # Файл базы открывается в start(), а не при создании объекта: импорт main не трогает диск
+        self._writer_db: Optional[DatabaseManager] = None
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._local = threading.local()
+        self._reader_dbs: List[DatabaseManager] = []
+        self._reader_lock = threading.Lock()
+        self._readers = ThreadPoolExecutor(
+            max_workers=readers,
+            thread_name_prefix="db-reader",
+            initializer=self._open_reader
+        )
+
+    async def start(self) -> None:
+        """
+        Открывает соединение писателя в его потоке: оно применяет миграции и создаёт
+        WAL-файлы, без которых read-only соединения читателей не откроются
+        """
+        if self._writer_db is None:
+            loop = asyncio.get_running_loop()
+            self._writer_db = await loop.run_in_executor(
+                self._writer, partial(DatabaseManager, self.db_path, archive_path=self.archive_path)
+            )
+            unsaved = self._load_unsaved()
+            if unsaved:
+                print(f"🔁 Отчётов, не записанных при прошлой остановке: {len(unsaved)}, пишем снова")
+                self._retrying.extend(unsaved)
+                self._schedule_retry()
+
+    def _load_unsaved(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.unsaved_path, "r", encoding="utf-8") as f:
+                reports = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+        # Отчёты уже в памяти: если они снова не запишутся, close() сохранит их заново
+        os.remove(self.unsaved_path)
+        return reports
+
+    def _store_unsaved(self, reports: List[Dict[str, Any]]) -> None:
+        with open(self.unsaved_path, "a", encoding="utf-8") as f:
+            for report in reports:
+                f.write(json.dumps(report, ensure_ascii=False) + "\n")
+
+    def _open_reader(self) -> None:
+        reader = DatabaseManager(self.db_path, readonly=True, archive_path=self.archive_path)
+        self._local.db = reader
+        with self._reader_lock:
+            self._reader_dbs.append(reader)
+
+    def _call_reader(self, method: str, *args) -> Any:
+        return getattr(self._local.db, method)(*args)
+
+    async def _run(self, executor: ThreadPoolExecutor, func: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        with phase("db"):
+            return await loop.run_in_executor(executor, partial(func, *args))
+
+    async def _read(self, method: str, *args) -> Any:
+        return await self._run(self._readers, self._call_reader, method, *args)
+
+    async def _write(self, method: str, *args) -> Any:
+        # Отложенные отчёты уходят в поток-писатель раньше этой записи
+        self._submit_pending()
+        return await self._run(self._writer, self._call_writer, method, *args)
+
+    def _call_writer(self, method: str, *args) -> Any:
+        result = getattr(self._writer_db, method)(*args)
+        self.last_write_at = time.time()
+        return result
+
+    def _submit_pending(self) -> None:
+        """Передаёт накопленную пачку отчётов потоку-писателю (без ожидания)"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self._submit_batch(batch, retry=False)
+
+    def _submit_batch(self, batch: List[Dict[str, Any]], retry: bool) -> None:
+        future = asyncio.get_running_loop().run_in_executor(self._writer, self._save_batch, batch)
+        self._inflight.add(future)
+        self._inflight_reports += len(batch)
+        future.add_done_callback(partial(self._batch_done, len(batch), retry))
+
+    def _batch_done(self, size: int, retry: bool, future: asyncio.Future) -> None:
+        self._inflight.discard(future)
+        self._inflight_reports -= size
+        failed = self._take_failed()
+        if failed:
+            self._retrying.extend(failed)
+            self._schedule_retry()
+        elif retry and not self._retrying:
+            self._retry_attempt = 0
+
+    def _take_failed(self) -> List[Dict[str, Any]]:
+        with self._failed_lock:
+            failed, self._failed = self._failed, []
+        return failed
+
+    def _schedule_retry(self) -> None:
+        if self._retry_handle is not None:
+            return
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** self._retry_attempt)
+        self._retry_attempt += 1
+        print(f"🔁 Не записано отчётов: {len(self._retrying)}, повтор через {delay:.0f} с")
+        self._retry_handle = asyncio.get_running_loop().call_later(delay, self._submit_retry)
+
+    def _submit_retry(self) -> None:
+        self._retry_handle = None
+        batch, self._retrying = self._retrying, []
+        if batch:
+            self._submit_batch(batch, retry=True)
+
+    def _save_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Пишет пачку в потоке-писателе; незаписанные отчёты уходят в _failed для повтора"""
+        try:
+            self._writer_db.save_reports(batch)
+            self.last_write_at = time.time()
+            return
+        except Exception as e:
+            # Один битый отчёт не должен потянуть за собой всю пачку
+            print(f"❌ Ошибка пакетной записи отчётов: {e}")
+        failed = []
+        for report in batch:
+            try:
+                self._writer_db.save_report(report)
+                self.last_write_at = time.time()
+            except Exception as e:
+                print(f"❌ Отчёт не сохранён, будет повтор: {e} ({report})")
+                failed.append(report)
+        if failed:
+            with self._failed_lock:
+                self._failed.extend(failed)
+                self.failed_writes += len(failed)
+
+    async def flush(self) -> None:
+        """
+        Дожидается записи всех отложенных отчётов. Отчёты из очереди повторов
+        не ждёт: они пишутся по своему таймеру и не должны задерживать команды
+        (см. retrying_reports_for в описании класса).
+        """
+        self._submit_pending()
+        if self._inflight:
+            with phase("db"):
+                await asyncio.gather(*self._inflight)
+
+    @property
+    def pending_reports(self) -> int:
+        return len(self._pending)
+
+    @property
+    def queue_depth(self) -> int:
+        """Отчёты, ещё не записанные в БД: в очереди, в пачках у потока-писателя и в очереди повторов"""
+        return len(self._pending) + self._inflight_reports + len(self._retrying)
+
+    @property
+    def retrying_reports(self) -> int:
+        return len(self._retrying)
+
+    def retrying_reports_for(self, guild_id: int) -> int:
+        return sum(1 for report in self._retrying if report["guild_id"] == guild_id)
+
+    # --- Контракты ---
+    async def load_contracts_from_file(self, guild_id: int, filename: str) -> Dict[str, List[str]]:
+        return await self._write("load_contracts_from_file", guild_id, filename)
+
+    async def get_contract_by_name(self, guild_id: int, name: str) -> Optional[Dict[str, Any]]:
+        return await self._read("get_contract_by_name", guild_id, name)
+
+    async def get_all_contracts(self, guild_id: int) -> List[Dict[str, Any]]:
+        return await self._read("get_all_contracts", guild_id)
+
+    # --- Отчёты ---
+    async def save_report(self, report: Dict[str, Any]) -> None:
+        """Ставит отчёт в очередь записи и сразу возвращает управление"""
+        self._pending.append(report)
+        if len(self._pending) >= self.batch_size:
+            self._submit_pending()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_delay, self._submit_pending)
+
+    async def get_reports_by_days(self, guild_id: int, days: int) -> List[Dict[str, Any]]:
+        await self.flush()
+        return await self._read("get_reports_by_days", guild_id, days)
+
+    async def summarize_reports(self, guild_id: int, since: datetime, until: Optional[datetime] = None,
+                                group_by: Optional[str] = None) -> Dict[str, Any]:
+        await self.flush()
+        return await self._read("summarize_reports", guild_id, since, until, group_by)
+
+    async def get_participant_earnings_page(self, guild_id: int, since: datetime, until: Optional[datetime] = None,
+                                            after: Optional[str] = None, before: Optional[str] = None,
+                                            limit: int = 20) -> List[Dict[str, Any]]:
+        await self.flush()
+        return await self._read("get_participant_earnings_page", guild_id, since, until, after, before, limit)
+
+    async def delete_reports_older_than(self, guild_id: Optional[int], days: int) -> int:
+        return await self._write("delete_reports_older_than", guild_id, days)
+
+    async def delete_reports_by_date(self, guild_id: int, date_str: str) -> int:
+        return await self._write("delete_reports_by_date", guild_id, date_str)
+
+    async def rebuild_rollups(self) -> int:
+        return await self._write("rebuild_rollups")
+
+    async def maintain(self, archive_after_months: int = 3, vacuum_threshold: float = 0.2) -> Dict[str, Any]:
+        return await self._write("maintain", archive_after_months, vacuum_threshold)
+
+    # --- Пользователи ---
+    async def store_user_language(self, guild_id: int, user_id: int, language: str) -> None:
+        await self._write("set_user_language", guild_id, user_id, language)
+
+    async def find_user_language(self, guild_id: int, user_id: int) -> Optional[str]:
+        return await self._read("find_user_language", guild_id, user_id)
+
+    def close(self) -> None:
+        """Дожидается завершения очереди записи, дописывает отложенные отчёты и закрывает соединения"""
+        for handle in (self._flush_handle, self._retry_handle):
+            if handle is not None:
+                handle.cancel()
+        self._flush_handle = self._retry_handle = None
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._reader_lock:
+            for reader in self._reader_dbs:
+                reader.close()
+            self._reader_dbs.clear()
+        if self._writer_db is None:
+            return  # start() не вызывался: записывать некуда и нечего
+        batch = self._take_failed() + self._retrying + self._pending
+        self._pending, self._retrying = [], []
+        if batch:
+            self._save_batch(batch)
+        failed = self._take_failed()
+        if failed:
+            # Последняя попытка не удалась — отчёты переживут перезапуск в файле
+            self._store_unsaved(failed)
+            print(f"⚠️ Не записано отчётов: {len(failed)}, сохранены в {self.unsaved_path}")
+        self._writer_db.close()
+        self._writer_db = None
@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import os
+import time
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional, Tuple, List, Dict, Any
+
+from core.storage import Storage
+from core.database_sqlite import LEGACY_GUILD_ID
+
+
+def contract_key(name: str) -> str:
+    """
+    Короткий стабильный ключ контракта для custom_id компонентов (лимит Discord — 100 символов).
+    Зависит только от имени, поэтому переживает перезапуск и перезагрузку каталога.
+    """
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()[:12]
+
+
+class ContractCatalog:
+    """Неизменяемый снимок каталога контрактов: индексы по имени и ключу, список, отсортированный для select-меню"""
+
+    __slots__ = ("contracts", "_by_name", "_by_key", "file_hash")
+
+    def __init__(self, contracts: Iterable[Dict[str, Any]], file_hash: Optional[str] = None):
+        items = sorted((MappingProxyType(dict(c)) for c in contracts), key=lambda c: c["name"])
+        self.contracts: Tuple[Mapping[str, Any], ...] = tuple(items)
+        self._by_name = MappingProxyType({c["name"]: c for c in self.contracts})
+        self._by_key = MappingProxyType({contract_key(c["name"]): c for c in self.contracts})
+        self.file_hash = file_hash
+
+    def get(self, name: str) -> Optional[Mapping[str, Any]]:
+        return self._by_name.get(name)
+
+    def get_by_key(self, key: str) -> Optional[Mapping[str, Any]]:
+        return self._by_key.get(key)
+
+    def __len__(self) -> int:
+        return len(self.contracts)
+
+
+def _read_file_state(path: str) -> Optional[Tuple[int, str]]:
+    """(mtime_ns, sha256) файла контрактов или None, если файла нет"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, "rb") as f:
+            return mtime, hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _guild_files(directory: Optional[str]) -> Dict[int, str]:
+    """Файлы собственных каталогов серверов: <directory>/<guild_id>.json"""
+    if not directory:
+        return {}
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return {}
+    files = {}
+    for entry in entries:
+        stem, ext = os.path.splitext(entry.name)
+        if ext == ".json" and stem.isdigit() and entry.is_file():
+            files[int(stem)] = entry.path
+    return files
+
+
+class ContractRegistry:
+    """
+    Держит каталоги контрактов в памяти процесса: общий (файл path, LEGACY_GUILD_ID)
+    и собственные каталоги серверов из guild_dir/<guild_id>.json. Сервер без своего
+    файла пользуется общим каталогом. Каталоги загружаются при старте и атомарно
+    подменяются целиком при /reload_contracts или при изменении файла (mtime, затем хеш).
+    """
+
+    def __init__(self, db: Storage, path: str, guild_dir: Optional[str] = None,
+                 cooldown_minutes: float = 0):
+        self.db = db
+        self.path = path
+        self.guild_dir = guild_dir
+        self.cooldown = cooldown_minutes * 60
+        self.catalogs: Dict[int, ContractCatalog] = {LEGACY_GUILD_ID: ContractCatalog(())}
+        self.hits = 0
+        self.misses = 0
+        self._paths: Dict[int, str] = {LEGACY_GUILD_ID: path}
+        self._mtimes: Dict[int, Optional[int]] = {}
+        self._last_reload: Dict[int, float] = {}
+        self._lock = asyncio.Lock()
+
+    def catalog(self, guild_id: Optional[int]) -> ContractCatalog:
+        """Каталог сервера или общий, если своего файла у сервера нет"""
+        catalog = self.catalogs.get(guild_id)
+        return catalog if catalog is not None else self.catalogs[LEGACY_GUILD_ID]
+
+    def get(self, guild_id: Optional[int], name: str) -> Optional[Mapping[str, Any]]:
+        return self._count(self.catalog(guild_id).get(name))
+
+    def get_by_key(self, guild_id: Optional[int], key: str) -> Optional[Mapping[str, Any]]:
+        """Поиск по ключу из custom_id (см. contract_key)"""
+        return self._count(self.catalog(guild_id).get_by_key(key))
+
+    def _count(self, contract: Optional[Mapping[str, Any]]) -> Optional[Mapping[str, Any]]:
+        if contract is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return contract
+
+    def size(self) -> int:
+        """Контрактов во всех загруженных каталогах"""
+        return sum(len(catalog) for catalog in self.catalogs.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {"catalogs": len(self.catalogs), "contracts": self.size(), "hits": self.hits, "misses": self.misses}
+
+    def _catalog_id(self, guild_id: int) -> int:
+        """Чей каталог перезагружает сервер: собственный файл или общий"""
+        return guild_id if guild_id in self._paths else LEGACY_GUILD_ID
+
+    def cooldown_remaining(self, guild_id: int) -> float:
+        """
+        Сколько секунд осталось до следующей разрешённой ручной перезагрузки каталога сервера.
+        Кулдаун общего каталога один на все серверы без собственного файла.
+        """
+        last_reload = self._last_reload.get(self._catalog_id(guild_id))
+        if last_reload is None:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - last_reload))
+
+    async def load(self) -> None:
+        """Первичная загрузка при старте: файлы -> БД -> каталоги"""
+        await self.reload(LEGACY_GUILD_ID, force=True)
+        guild_files = await asyncio.to_thread(_guild_files, self.guild_dir)
+        for guild_id, path in guild_files.items():
+            self._paths[guild_id] = path
+            await self.reload(guild_id, force=True)
+
+    async def reload(self, guild_id: int = LEGACY_GUILD_ID,
+                     force: bool = False) -> Optional[Dict[str, List[str]]]:
+        """
+        Перечитывает файл каталога guild_id, синхронизирует БД и подменяет каталог.
+        Без force ничего не делает, если содержимое файла не изменилось. Если у сервера
+        пропал собственный файл, он возвращается к общему каталогу. Возвращает изменения
+        ({"added", "updated", "removed"}) или None, если перезагрузка не понадобилась.
+        """
+        path = self._paths.get(guild_id)
+        if path is None:
+            return None
+        async with self._lock:
+            state = await asyncio.to_thread(_read_file_state, path)
+            file_hash = state[1] if state else None
+            self._mtimes[guild_id] = state[0] if state else None
+            current = self.catalogs.get(guild_id)
+            if state is None and guild_id != LEGACY_GUILD_ID:
+                self.catalogs.pop(guild_id, None)
+                self._paths.pop(guild_id, None)
+                self._mtimes.pop(guild_id, None)
+                return None
+            if not force and current is not None and file_hash == current.file_hash:
+                return None
+            changes = await self.db.load_contracts_from_file(guild_id, path)
+            contracts = await self.db.get_all_contracts(guild_id)
+            # Подмена ссылки атомарна: читатели видят либо старый, либо новый снимок целиком
+            self.catalogs[guild_id] = ContractCatalog(contracts, file_hash)
+            return changes
+
+    async def manual_reload(self, guild_id: int) -> Dict[str, List[str]]:
+        """
+        Перезагрузка по команде администратора сервера: его собственный файл
+        (появившийся в том числе после старта) или общий. Время для кулдауна
+        запоминается только после успешной перезагрузки, по перезагруженному каталогу.
+        """
+        guild_files = await asyncio.to_thread(_guild_files, self.guild_dir)
+        if guild_id in guild_files:
+            self._paths[guild_id] = guild_files[guild_id]
+        elif guild_id in self._paths:
+            # Собственный файл удалён: сервер возвращается к общему каталогу
+            await self.reload(guild_id)
+        catalog_id = self._catalog_id(guild_id)
+        changes = await self.reload(catalog_id, force=True)
+        self._last_reload[catalog_id] = time.monotonic()
+        return changes
+
+    async def watch(self, interval: float) -> None:
+        """Фоновая задача: следит за mtime файлов и перезагружает каталоги при изменении содержимого"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                guild_files = await asyncio.to_thread(_guild_files, self.guild_dir)
+            except OSError as e:
+                print(f"❌ Ошибка чтения каталога контрактов серверов: {e}")
+                continue
+            for guild_id, path in guild_files.items():
+                self._paths.setdefault(guild_id, path)
+            for guild_id, path in list(self._paths.items()):
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except FileNotFoundError:
+                    mtime = None
+                if guild_id in self._mtimes and mtime == self._mtimes[guild_id]:
+                    continue
+                try:
+                    changes = await self.reload(guild_id)
+                    if changes is not None:
+                        print(f"🔄 Контракты перезагружены из {path}: "
+                              f"+{len(changes['added'])} ~{len(changes['updated'])} -{len(changes['removed'])}")
+                except Exception as e:
+                    print(f"❌ Ошибка при перезагрузке контрактов из {path}: {e}")
@@ -0,0 +1,388 @@
+import json
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional
+
+try:
+    import asyncpg
+except ImportError:  # Нужен только для DATABASE_BACKEND=postgres
+    asyncpg = None
+
+from core.database_sqlite import LEGACY_GUILD_ID, parse_contracts
+from core.instrumentation import phase
+from core.storage import Storage
+
+# Выражения группировки для summarize_reports: ключ группы и подпись к нему.
+# COLLATE "C" — бинарный порядок ключей, как в SQLite, чтобы страницы совпадали у обоих бэкендов
+SUMMARY_GROUPS = {
+    "day": ("to_char(r.timestamp AT TIME ZONE 'UTC', 'YYYY-MM-DD')",
+            "to_char(r.timestamp AT TIME ZONE 'UTC', 'YYYY-MM-DD')"),
+    "contract": ('r.contract_name COLLATE "C"', "MAX(r.contract_name)"),
+    "leader": ("r.author_id", "MAX(r.author_name)"),
+    "participant": ('p.display_name COLLATE "C"', "MAX(p.display_name)"),
+}
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS contracts (
+        guild_id BIGINT NOT NULL,
+        name TEXT NOT NULL,
+        amount DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (guild_id, name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        language TEXT NOT NULL,
+        PRIMARY KEY (guild_id, user_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS reports (
+        id BIGSERIAL PRIMARY KEY,
+        guild_id BIGINT NOT NULL,
+        contract_name TEXT NOT NULL,
+        author_id BIGINT NOT NULL,
+        author_name TEXT NOT NULL,
+        amount DOUBLE PRECISION NOT NULL,
+        fund DOUBLE PRECISION NOT NULL,
+        per_user DOUBLE PRECISION NOT NULL,
+        participant_count INTEGER NOT NULL,
+        timestamp TIMESTAMPTZ NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS report_participants (
+        report_id BIGINT NOT NULL REFERENCES reports(id) ON DELETE CASCADE,
+        user_id BIGINT,
+        display_name TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_reports_guild_timestamp ON reports(guild_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_reports_timestamp ON reports(timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_report_participants_report "
+    "ON report_participants(report_id, user_id, display_name)",
+]
+
+# Ключ advisory-блокировки, под которой процессы по очереди создают схему
+SCHEMA_LOCK = 0x63617374656C6C6F
+
+# Отчёт и его участники вставляются одним запросом: одна транзакция и один обмен с сервером
+INSERT_REPORT = """
+    WITH r AS (
+        INSERT INTO reports (guild_id, contract_name, author_id, author_name,
+                             amount, fund, per_user, participant_count, timestamp)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, cardinality($9::text[]), $8)
+        RETURNING id
+    )
+    INSERT INTO report_participants (report_id, user_id, display_name)
+    SELECT r.id, p.user_id, p.display_name
+    FROM r, unnest($10::bigint[], $9::text[]) AS p(user_id, display_name)
+"""
+
+
+def _count(status: str) -> int:
+    """'DELETE 42' -> 42"""
+    return int(status.split()[-1])
+
+
+class PostgresStorage(Storage):
+    """
+    Хранилище на PostgreSQL через пул соединений asyncpg. В отличие от SQLite-файла
+    его могут разделять несколько процессов бота (шарды): каждая запись — отдельная
+    короткая транзакция на своём соединении из пула, без общего файлового замка.
+
+    Дневных итогов здесь нет: их строки стали бы точкой конкуренции между писателями,
+    а сводки по индексу (guild_id, timestamp) PostgreSQL считает сам.
+    Срок хранения — DELETE с каскадом на участников, обслуживание — ANALYZE
+    (освобождение места берёт на себя autovacuum).
+    """
+
+    def __init__(self, dsn: str, min_size: int = 2, max_size: int = 10,
+                 language_cache_size: int = 10000, language_cache_ttl: float = 3600):
+        if asyncpg is None:
+            raise RuntimeError("Для DATABASE_BACKEND=postgres нужен пакет asyncpg: pip install asyncpg")
+        if not dsn:
+            raise ValueError("Для DATABASE_BACKEND=postgres нужно задать DATABASE_URL")
+        super().__init__(language_cache_size, language_cache_ttl)
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool: Optional["asyncpg.Pool"] = None
+        self._saving = 0
+
+    async def start(self) -> None:
+        if self._pool is not None:
+            return
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=self.min_size, max_size=self.max_size)
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", SCHEMA_LOCK)
+                for statement in SCHEMA:
+                    await conn.execute(statement)
+
+    @property
+    def pool(self) -> "asyncpg.Pool":
+        if self._pool is None:
+            raise RuntimeError("PostgresStorage не запущен: сначала await start()")
+        return self._pool
+
+    async def aclose(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    def close(self) -> None:
+        # Event loop уже остановлен: корректно закрыть пул нельзя, соединения просто обрываются
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._saving
+
+    async def _fetch(self, sql: str, *args) -> List[Dict[str, Any]]:
+        with phase("db"):
+            return [dict(row) for row in await self.pool.fetch(sql, *args)]
+
+    async def _fetchrow(self, sql: str, *args) -> Optional[Dict[str, Any]]:
+        with phase("db"):
+            row = await self.pool.fetchrow(sql, *args)
+        return dict(row) if row is not None else None
+
+    async def _execute(self, sql: str, *args) -> str:
+        with phase("db"):
+            status = await self.pool.execute(sql, *args)
+        self.last_write_at = time.time()
+        return status
+
+    # --- Контракты ---
+    async def load_contracts_from_file(self, guild_id: int, filename: str) -> Dict[str, List[str]]:
+        """
+        Синхронизирует контракты сервера guild_id с файлом одной транзакцией
+        (под advisory-блокировкой сервера, чтобы два процесса не применили одно изменение дважды).
+        Возвращает {"added": [...], "updated": [...], "removed": [...]} с именами контрактов.
+        """
+        changes = {"added": [], "updated": [], "removed": []}
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                contracts = parse_contracts(json.load(f))
+        except FileNotFoundError:
+            return changes
+
+        with phase("db"):
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute("SELECT pg_advisory_xact_lock(hashtext('contracts'), hashtext($1::text))",
+                                       str(guild_id))
+                    current = {row["name"]: row["amount"] for row in await conn.fetch(
+                        "SELECT name, amount FROM contracts WHERE guild_id = $1", guild_id
+                    )}
+                    for name, amount in contracts.items():
+                        if name not in current:
+                            changes["added"].append(name)
+                        elif current[name] != amount:
+                            changes["updated"].append(name)
+                    changes["removed"] = [name for name in current if name not in contracts]
+                    await conn.executemany(
+                        "INSERT INTO contracts (guild_id, name, amount) VALUES ($1, $2, $3)",
+                        [(guild_id, name, contracts[name]) for name in changes["added"]]
+                    )
+                    await conn.executemany(
+                        "UPDATE contracts SET amount = $1 WHERE guild_id = $2 AND name = $3",
+                        [(contracts[name], guild_id, name) for name in changes["updated"]]
+                    )
+                    await conn.executemany(
+                        "DELETE FROM contracts WHERE guild_id = $1 AND name = $2",
+                        [(guild_id, name) for name in changes["removed"]]
+                    )
+        self.last_write_at = time.time()
+        return changes
+
+    async def get_contract_by_name(self, guild_id: int, name: str) -> Optional[Dict[str, Any]]:
+        return await self._fetchrow(
+            "SELECT name, amount FROM contracts WHERE guild_id = $1 AND name = $2", guild_id, name
+        )
+
+    async def get_all_contracts(self, guild_id: int) -> List[Dict[str, Any]]:
+        return await self._fetch("SELECT name, amount FROM contracts WHERE guild_id = $1", guild_id)
+
+    # --- Отчёты ---
+    async def save_report(self, report: Dict[str, Any]) -> None:
+        """Сохраняет отчёт вместе с участниками (запрос INSERT_REPORT)"""
+        names = list(report["participants"])
+        ids = report.get("participant_ids") or [None] * len(names)
+        self._saving += 1
+        try:
+            await self._execute(
+                INSERT_REPORT,
+                report["guild_id"],
+                report["contract_name"],
+                report["author_id"],
+                report["author_name"],
+                report["amount"],
+                report["fund"],
+                report["per_user"],
+                datetime.fromisoformat(report["timestamp"]),
+                names,
+                list(ids)
+            )
+        finally:
+            self._saving -= 1
+
+    async def get_reports_by_days(self, guild_id: int, days: int) -> List[Dict[str, Any]]:
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+        with phase("db"):
+            async with self.pool.acquire() as conn:
+                # Отчёты и участники из одного снимка
+                async with conn.transaction(isolation="repeatable_read", readonly=True):
+                    rows = await conn.fetch("""
+                        SELECT id, guild_id, contract_name, author_id, author_name,
+                               amount, fund, per_user, timestamp
+                        FROM reports WHERE guild_id = $1 AND timestamp >= $2
+                        ORDER BY timestamp, id
+                    """, guild_id, cutoff_date)
+                    participants = await conn.fetch("""
+                        SELECT p.report_id, p.user_id, p.display_name
+                        FROM reports r JOIN report_participants p ON p.report_id = r.id
+                        WHERE r.guild_id = $1 AND r.timestamp >= $2
+                        ORDER BY p.report_id, p.user_id NULLS FIRST, p.display_name COLLATE "C"
+                    """, guild_id, cutoff_date)
+        reports = {}
+        for row in rows:
+            report = dict(row)
+            report["timestamp"] = report["timestamp"].astimezone(timezone.utc).isoformat()
+            report["participants"] = []
+            report["participant_ids"] = []
+            reports[report["id"]] = report
+        for row in participants:
+            report = reports.get(row["report_id"])
+            if report is not None:
+                report["participants"].append(row["display_name"])
+                report["participant_ids"].append(row["user_id"])
+        return list(reports.values())
+
+    def _window(self, guild_id: int, since: datetime, until: Optional[datetime]):
+        where = "r.guild_id = $1 AND r.timestamp >= $2"
+        params: List[Any] = [guild_id, since]
+        if until is not None:
+            where += " AND r.timestamp < $3"
+            params.append(until)
+        return where, params
+
+    async def summarize_reports(self, guild_id: int, since: datetime, until: Optional[datetime] = None,
+                                group_by: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Считает итоги по отчётам сервера guild_id в окне [since, until) на стороне PostgreSQL.
+        Формат результата тот же, что у DatabaseManager.summarize_reports.
+        """
+        if group_by is not None and group_by not in SUMMARY_GROUPS:
+            raise ValueError(f"Неизвестная группировка: {group_by}")
+        where, params = self._window(guild_id, since, until)
+        row = await self._fetchrow(f"""
+            SELECT COUNT(*) AS reports,
+                   COALESCE(SUM(r.amount), 0) AS amount,
+                   COALESCE(SUM(r.fund), 0) AS fund,
+                   COALESCE(SUM(r.per_user * r.participant_count), 0) AS payout
+            FROM reports r WHERE {where}
+        """, *params)
+        summary = {
+            "reports": row["reports"],
+            "total_amount": row["amount"],
+            "total_fund": row["fund"],
+            "total_payout": row["payout"],
+            "groups": []
+        }
+        if group_by is None or not summary["reports"]:
+            return summary
+
+        key, label = SUMMARY_GROUPS[group_by]
+        if group_by == "participant":
+            source = "reports r JOIN report_participants p ON p.report_id = r.id"
+            payout = "SUM(r.per_user)"
+        else:
+            source = "reports r"
+            payout = "SUM(r.per_user * r.participant_count)"
+        summary["groups"] = await self._fetch(f"""
+            SELECT {key} AS key, {label} AS label, COUNT(*) AS reports,
+                   SUM(r.amount) AS amount, SUM(r.fund) AS fund, {payout} AS payout
+            FROM {source} WHERE {where}
+            GROUP BY 1 ORDER BY 1
+        """, *params)
+        return summary
+
+    async def get_participant_earnings_page(self, guild_id: int, since: datetime, until: Optional[datetime] = None,
+                                            after: Optional[str] = None, before: Optional[str] = None,
+                                            limit: int = 20) -> List[Dict[str, Any]]:
+        """Keyset-страница заработков участников, как DatabaseManager.get_participant_earnings_page"""
+        where, params = self._window(guild_id, since, until)
+        order = "ASC"
+        if after is not None:
+            params.append(after)
+            where += f' AND p.display_name COLLATE "C" > ${len(params)}'
+        elif before is not None:
+            params.append(before)
+            where += f' AND p.display_name COLLATE "C" < ${len(params)}'
+            order = "DESC"
+        params.append(limit)
+        rows = await self._fetch(f"""
+            SELECT p.display_name COLLATE "C" AS key, COUNT(*) AS reports, SUM(r.per_user) AS payout
+            FROM reports r JOIN report_participants p ON p.report_id = r.id
+            WHERE {where}
+            GROUP BY 1 ORDER BY 1 {order} LIMIT ${len(params)}
+        """, *params)
+        if order == "DESC":
+            rows.reverse()
+        return rows
+
+    # --- Срок хранения и обслуживание ---
+    async def delete_reports_older_than(self, guild_id: Optional[int], days: int) -> int:
+        """Удаляет отчёты сервера старше days дней (guild_id=None — всех серверов), участники — каскадом"""
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+        if guild_id is None:
+            return _count(await self._execute("DELETE FROM reports WHERE timestamp < $1", cutoff_date))
+        return _count(await self._execute(
+            "DELETE FROM reports WHERE guild_id = $1 AND timestamp < $2", guild_id, cutoff_date
+        ))
+
+    async def delete_reports_by_date(self, guild_id: int, date_str: str) -> int:
+        """Удаляет отчёты сервера guild_id за день date_str (YYYY-MM-DD, UTC)"""
+        start_dt = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        return _count(await self._execute(
+            "DELETE FROM reports WHERE guild_id = $1 AND timestamp >= $2 AND timestamp < $3",
+            guild_id, start_dt, start_dt + timedelta(days=1)
+        ))
+
+    async def assign_legacy_guild(self, guild_id: int) -> int:
+        """Переносит отчёты без сервера (LEGACY_GUILD_ID) на сервер guild_id"""
+        return _count(await self._execute(
+            "UPDATE reports SET guild_id = $1 WHERE guild_id = $2", guild_id, LEGACY_GUILD_ID
+        ))
+
+    async def maintain(self, archive_after_months: int = 3, vacuum_threshold: float = 0.2) -> Dict[str, Any]:
+        """
+        Обновляет статистику планировщика. Архива здесь нет (архивирование месяцев — механизм
+        SQLite-бэкенда), VACUUM выполняет autovacuum, поэтому оба списка всегда пустые.
+        """
+        with phase("db"):
+            await self.pool.execute("ANALYZE reports, report_participants")
+        return {"archived": [], "dropped": [], "vacuumed": []}
+
+    # --- Пользователи ---
+    async def store_user_language(self, guild_id: int, user_id: int, language: str) -> None:
+        await self._execute("""
+            INSERT INTO users (guild_id, user_id, language) VALUES ($1, $2, $3)
+            ON CONFLICT (guild_id, user_id) DO UPDATE SET language = excluded.language
+        """, guild_id, user_id, language)
+
+    async def find_user_language(self, guild_id: int, user_id: int) -> Optional[str]:
+        """Язык на сервере или выбор, сделанный до поддержки нескольких серверов (LEGACY_GUILD_ID)"""
+        row = await self._fetchrow("""
+            SELECT language FROM users
+            WHERE guild_id IN ($1, $2) AND user_id = $3
+            ORDER BY guild_id = $1 DESC LIMIT 1
+        """, guild_id, LEGACY_GUILD_ID, user_id)
+        return row["language"] if row else None
@@ -1,136 +1,947 @@
 import sqlite3
 import json
+import re
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
 from datetime import datetime, timezone, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+
+DEFAULT_LANGUAGE = "ru"
+
+# guild_id данных, созданных до поддержки нескольких серверов (и общий каталог контрактов)
+LEGACY_GUILD_ID = 0
+
+# Выражения группировки для summarize_reports: ключ группы и подпись к нему
+SUMMARY_GROUPS = {
+    "day": ("substr(r.timestamp, 1, 10)", "substr(r.timestamp, 1, 10)"),
+    "contract": ("r.contract_name", "r.contract_name"),
+    "leader": ("r.author_id", "MAX(r.author_name)"),
+    "participant": ("p.display_name", "p.display_name"),
+}
+
+# Отчёты хранятся помесячными партициями reports_YYYY_MM / report_participants_YYYY_MM.
+# Холодные месяцы переносятся в файл архива, который подключается как схема archive.
+ARCHIVE_SCHEMA = "archive"
+_MONTH_RE = re.compile(r"\d{4}_\d{2}")
+
+def partition_month(timestamp: str) -> str:
+    """Партиция отчёта по его ISO-времени (UTC): '2024-05-17T…' -> '2024_05'"""
+    return f"{timestamp[:4]}_{timestamp[5:7]}"
+
+def month_start(month: str) -> datetime:
+    return datetime(int(month[:4]), int(month[5:7]), 1, tzinfo=timezone.utc)
+
+def shift_month(month: str, delta: int) -> str:
+    index = int(month[:4]) * 12 + int(month[5:7]) - 1 + delta
+    return f"{index // 12:04d}_{index % 12 + 1:02d}"
+
+def partition_tables(month: str, schema: str = "main") -> Tuple[str, str]:
+    """Имена таблиц отчётов и участников партиции (имя месяца проверяется: оно попадает в SQL)"""
+    if not _MONTH_RE.fullmatch(month):
+        raise ValueError(f"Некорректная партиция: {month!r}")
+    return f"{schema}.reports_{month}", f"{schema}.report_participants_{month}"
+
+def default_archive_path(db_path: str) -> str:
+    """database.sqlite -> database.archive.sqlite рядом с основной базой"""
+    path = Path(db_path)
+    return str(path.with_name(f"{path.stem}.archive{path.suffix or '.sqlite'}"))
+
+def parse_contracts(data: Any) -> Dict[str, float]:
+    """Проверяет содержимое contracts.json и возвращает {name: amount}; при ошибке — ValueError"""
+    if not isinstance(data, list):
+        raise ValueError("Файл контрактов должен содержать список")
+    contracts: Dict[str, float] = {}
+    for index, item in enumerate(data):
+        name = item.get("name") if isinstance(item, dict) else None
+        amount = item.get("amount") if isinstance(item, dict) else None
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError(f"Контракт #{index + 1}: не указано имя")
+        if isinstance(amount, bool) or not isinstance(amount, (int, float)) or amount < 0:
+            raise ValueError(f"Контракт «{name}»: некорректная сумма {amount!r}")
+        if name in contracts:
+            raise ValueError(f"Контракт «{name}» указан дважды")
+        contracts[name] = float(amount)
+    return contracts
 
 class DatabaseManager:
-    def __init__(self, db_path: str = "database.sqlite"):
+    def __init__(self, db_path: str = "database.sqlite", readonly: bool = False,
+                 archive_path: Optional[str] = None):
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.archive_path = archive_path or default_archive_path(db_path)
+        self.readonly = readonly
+        if readonly:
+            # Read-only соединение для пула читателей: схему не трогаем
+            uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # WAL позволяет читателям работать параллельно с писателем
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
         self.conn.row_factory = sqlite3.Row
-        self._create_tables()
+        self._archive_attached = False
+        if not readonly:
+            self._attach_archive()
+            self._create_tables()
+
+    def _attach_archive(self) -> bool:
+        """
+        Подключает файл архива как схему archive: писателю — на запись (файл создаётся),
+        читателям — только на чтение и лишь когда писатель его уже создал.
+        """
+        if self._archive_attached:
+            return True
+        path = Path(self.archive_path).resolve()
+        if self.readonly:
+            if not path.exists():
+                return False
+            self.conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path.as_uri() + "?mode=ro",))
+        else:
+            self.conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (str(path),))
+            self.conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.journal_mode=WAL")
+            self.conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.synchronous=NORMAL")
+        self._archive_attached = True
+        return True
+
+    def close(self) -> None:
+        self.conn.close()
 
     def _create_tables(self):
-        with self.conn:
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS contracts (
-                    name TEXT PRIMARY KEY,
-                    amount REAL NOT NULL
-                )
-            """)
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS reports (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    contract_name TEXT NOT NULL,
-                    author_id INTEGER NOT NULL,
-                    author_name TEXT NOT NULL,
-                    participants TEXT NOT NULL,
-                    amount REAL NOT NULL,
-                    fund REAL NOT NULL,
-                    per_user REAL NOT NULL,
-                    timestamp TEXT NOT NULL
-                )
+        """Применяет недостающие миграции схемы, версия хранится в PRAGMA user_version"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, migration in enumerate(self._migrations(), start=1):
+            if target <= version:
+                continue
+            with self.conn:
+                self.conn.execute("BEGIN")
+                migration()
+                self.conn.execute(f"PRAGMA user_version = {target}")
+
+    def _migrations(self):
+        return [
+            self._migration_initial,
+            self._migration_report_participants,
+            self._migration_daily_rollups,
+            self._migration_month_partitions,
+            self._migration_guilds,
+        ]
+
+    def _migration_initial(self):
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS contracts (
+                name TEXT PRIMARY KEY,
+                amount REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                contract_name TEXT NOT NULL,
+                author_id INTEGER NOT NULL,
+                author_name TEXT NOT NULL,
+                participants TEXT NOT NULL,
+                amount REAL NOT NULL,
+                fund REAL NOT NULL,
+                per_user REAL NOT NULL,
+                timestamp TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                user_id INTEGER PRIMARY KEY,
+                language TEXT DEFAULT 'ru'
+            )
+        """)
+
+    def _migration_report_participants(self):
+        """
+        Участники переезжают из JSON в отдельную таблицу report_participants,
+        колонка reports.participants удаляется, добавляются индексы.
+        """
+        self.conn.execute("""
+            CREATE TABLE reports_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                contract_name TEXT NOT NULL,
+                author_id INTEGER NOT NULL,
+                author_name TEXT NOT NULL,
+                amount REAL NOT NULL,
+                fund REAL NOT NULL,
+                per_user REAL NOT NULL,
+                timestamp TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE report_participants (
+                report_id INTEGER NOT NULL REFERENCES reports(id),
+                user_id INTEGER,
+                display_name TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            INSERT INTO reports_new (id, contract_name, author_id, author_name, amount, fund, per_user, timestamp)
+            SELECT id, contract_name, author_id, author_name, amount, fund, per_user, timestamp FROM reports
+        """)
+        # Старые отчёты хранили только имена, user_id для них неизвестен
+        rows = self.conn.execute("SELECT id, participants FROM reports")
+        self.conn.executemany(
+            "INSERT INTO report_participants (report_id, user_id, display_name) VALUES (?, NULL, ?)",
+            ((row["id"], name) for row in rows.fetchall() for name in json.loads(row["participants"]))
+        )
+        self.conn.execute("DROP TABLE reports")
+        self.conn.execute("ALTER TABLE reports_new RENAME TO reports")
+        self.conn.execute("CREATE INDEX idx_reports_timestamp ON reports(timestamp)")
+        self.conn.execute(
+            "CREATE INDEX idx_report_participants_report ON report_participants(report_id, user_id, display_name)"
+        )
+        # Покрывающий индекс для выборок по конкретному пользователю
+        self.conn.execute(
+            "CREATE INDEX idx_report_participants_user ON report_participants(user_id, report_id, display_name)"
+        )
+
+    def _migration_daily_rollups(self):
+        """Материализованные дневные итоги: общие и по участникам"""
+        self.conn.execute("""
+            CREATE TABLE daily_totals (
+                day TEXT PRIMARY KEY,
+                reports INTEGER NOT NULL,
+                amount REAL NOT NULL,
+                fund REAL NOT NULL,
+                payout REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("""
+            CREATE TABLE daily_participant_totals (
+                day TEXT NOT NULL,
+                display_name TEXT NOT NULL,
+                reports INTEGER NOT NULL,
+                amount REAL NOT NULL,
+                fund REAL NOT NULL,
+                payout REAL NOT NULL,
+                PRIMARY KEY (day, display_name)
+            ) WITHOUT ROWID
+        """)
+        # Итоги заполняются пересчётом в _migration_guilds, когда у них появляется guild_id
+
+    def _migration_month_partitions(self):
+        """
+        Таблицы reports/report_participants разбиваются на помесячные партиции.
+        id отчётов остаются сквозными: последний выданный хранится в report_sequence.
+        """
+        self.conn.execute("""
+            CREATE TABLE report_partitions (
+                month TEXT PRIMARY KEY,
+                archived INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE TABLE report_sequence (id INTEGER NOT NULL)")
+        self.conn.execute("""
+            INSERT INTO report_sequence (id) SELECT MAX(
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'reports'), 0),
+                COALESCE((SELECT MAX(id) FROM reports), 0)
+            )
+        """)
+        months = [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT substr(timestamp, 1, 4) || '_' || substr(timestamp, 6, 2) FROM reports"
+        )]
+        for month in months:
+            reports, participants = self._create_partition(month)
+            start, end = month_start(month).isoformat(), month_start(shift_month(month, 1)).isoformat()
+            self.conn.execute(f"""
+                INSERT INTO {reports} (id, contract_name, author_id, author_name, amount, fund, per_user, timestamp)
+                SELECT id, contract_name, author_id, author_name, amount, fund, per_user, timestamp
+                FROM reports WHERE timestamp >= ? AND timestamp < ? ORDER BY id
+            """, (start, end))
+            self.conn.execute(f"""
+                INSERT INTO {participants} SELECT p.report_id, p.user_id, p.display_name
+                FROM report_participants p JOIN {reports} r ON r.id = p.report_id
+                ORDER BY p.rowid
             """)
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    language TEXT DEFAULT 'ru'
+        self.conn.execute("DROP TABLE report_participants")
+        self.conn.execute("DROP TABLE reports")
+
+    def _migration_guilds(self):
+        """
+        Данные разделяются по серверам: guild_id в контрактах, настройках пользователей,
+        партициях отчётов и дневных итогах, индексы начинаются с guild_id.
+        Всё существующее получает LEGACY_GUILD_ID (см. assign_legacy_guild).
+        """
+        self.conn.execute("""
+            CREATE TABLE contracts_new (
+                guild_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                amount REAL NOT NULL,
+                PRIMARY KEY (guild_id, name)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute(
+            "INSERT INTO contracts_new (guild_id, name, amount) SELECT ?, name, amount FROM contracts",
+            (LEGACY_GUILD_ID,)
+        )
+        self.conn.execute("DROP TABLE contracts")
+        self.conn.execute("ALTER TABLE contracts_new RENAME TO contracts")
+
+        self.conn.execute("""
+            CREATE TABLE users_new (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                language TEXT DEFAULT 'ru',
+                PRIMARY KEY (guild_id, user_id)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute(
+            "INSERT INTO users_new (guild_id, user_id, language) SELECT ?, user_id, language FROM users",
+            (LEGACY_GUILD_ID,)
+        )
+        self.conn.execute("DROP TABLE users")
+        self.conn.execute("ALTER TABLE users_new RENAME TO users")
+
+        for month, schema in self._partitions():
+            reports, _ = partition_tables(month, schema)
+            columns = {row["name"] for row in self.conn.execute(f"PRAGMA {schema}.table_info(reports_{month})")}
+            # Архив в другом файле: при повторе после сбоя колонка там уже может быть
+            if "guild_id" not in columns:
+                self.conn.execute(
+                    f"ALTER TABLE {reports} ADD COLUMN guild_id INTEGER NOT NULL DEFAULT {LEGACY_GUILD_ID}"
                 )
-            """)
+            self.conn.execute(f"DROP INDEX IF EXISTS {schema}.idx_reports_{month}_timestamp")
+            self._create_partition(month, schema)
+
+        self.conn.execute("DROP TABLE daily_totals")
+        self.conn.execute("DROP TABLE daily_participant_totals")
+        self.conn.execute("""
+            CREATE TABLE daily_totals (
+                guild_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                reports INTEGER NOT NULL,
+                amount REAL NOT NULL,
+                fund REAL NOT NULL,
+                payout REAL NOT NULL,
+                PRIMARY KEY (guild_id, day)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("""
+            CREATE TABLE daily_participant_totals (
+                guild_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                display_name TEXT NOT NULL,
+                reports INTEGER NOT NULL,
+                amount REAL NOT NULL,
+                fund REAL NOT NULL,
+                payout REAL NOT NULL,
+                PRIMARY KEY (guild_id, day, display_name)
+            ) WITHOUT ROWID
+        """)
+        for month, schema in self._partitions():
+            self._adjust_rollups("1", (), 1, *partition_tables(month, schema))
+
+    def _create_partition(self, month: str, schema: str = "main") -> Tuple[str, str]:
+        """Создаёт таблицы и индексы партиции (если их нет) и возвращает их имена"""
+        reports, participants = partition_tables(month, schema)
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {reports} (
+                id INTEGER PRIMARY KEY,
+                contract_name TEXT NOT NULL,
+                author_id INTEGER NOT NULL,
+                author_name TEXT NOT NULL,
+                amount REAL NOT NULL,
+                fund REAL NOT NULL,
+                per_user REAL NOT NULL,
+                timestamp TEXT NOT NULL,
+                guild_id INTEGER NOT NULL DEFAULT {LEGACY_GUILD_ID}
+            )
+        """)
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {participants} (
+                report_id INTEGER NOT NULL,
+                user_id INTEGER,
+                display_name TEXT NOT NULL
+            )
+        """)
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_reports_{month}_guild_timestamp "
+                          f"ON reports_{month}(guild_id, timestamp)")
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_report_participants_{month}_report "
+                          f"ON report_participants_{month}(report_id, user_id, display_name)")
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_report_participants_{month}_user "
+                          f"ON report_participants_{month}(user_id, report_id, display_name)")
+        if schema == "main":
+            self.conn.execute("INSERT OR IGNORE INTO report_partitions (month) VALUES (?)", (month,))
+        return reports, participants
+
+    def _partitions(self, since: Optional[datetime] = None,
+                    until: Optional[datetime] = None) -> List[Tuple[str, str]]:
+        """
+        Партиции (месяц, схема), пересекающиеся с окном [since, until), по возрастанию месяца.
+        Читатель подключает архив при первой встрече архивной партиции.
+        """
+        sql, params = "SELECT month, archived FROM report_partitions WHERE 1", []
+        if since is not None:
+            sql += " AND month >= ?"
+            params.append(partition_month(since.astimezone(timezone.utc).isoformat()))
+        if until is not None:
+            sql += " AND month <= ?"
+            params.append(partition_month(until.astimezone(timezone.utc).isoformat()))
+        result = []
+        for month, archived in self.conn.execute(sql + " ORDER BY month", params).fetchall():
+            if archived and not self._attach_archive():
+                raise sqlite3.OperationalError(f"Файл архива не найден: {self.archive_path}")
+            result.append((month, ARCHIVE_SCHEMA if archived else "main"))
+        return result
 
-    def load_contracts_from_file(self, filename: str) -> None:
+    def _writable_partition(self, month: str) -> Tuple[str, str]:
+        """Таблицы партиции для записи: новая создаётся в основной базе, архивная дописывается в архив"""
+        row = self.conn.execute("SELECT archived FROM report_partitions WHERE month = ?", (month,)).fetchone()
+        if row is not None and row["archived"]:
+            return partition_tables(month, ARCHIVE_SCHEMA)
+        return self._create_partition(month)
+
+    @contextmanager
+    def _snapshot(self):
+        """
+        Читает список партиций и сами партиции в одной транзакции чтения,
+        чтобы параллельные удаление или архивирование месяца не выбили таблицу из-под запроса.
+        """
+        if self.conn.in_transaction:
+            yield
+            return
+        # ATTACH внутри транзакции невозможен: архив (если он уже создан) подключаем заранее
+        self._attach_archive()
+        self.conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            self.conn.execute("COMMIT")
+
+    def load_contracts_from_file(self, guild_id: int, filename: str) -> Dict[str, List[str]]:
+        """
+        Синхронизирует контракты сервера guild_id с файлом: вставляет новые, обновляет
+        изменившиеся суммы и удаляет отсутствующие в файле контракты одной транзакцией.
+        Возвращает {"added": [...], "updated": [...], "removed": [...]} с именами контрактов.
+        """
+        changes = {"added": [], "updated": [], "removed": []}
         try:
             with open(filename, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                for contract in data:
-                    self._add_contract(contract)
+                contracts = parse_contracts(json.load(f))
         except FileNotFoundError:
-            pass
+            return changes
+
+        current = {row["name"]: row["amount"] for row in self.conn.execute(
+            "SELECT name, amount FROM contracts WHERE guild_id = ?", (guild_id,)
+        )}
+        for name, amount in contracts.items():
+            if name not in current:
+                changes["added"].append(name)
+            elif current[name] != amount:
+                changes["updated"].append(name)
+        changes["removed"] = [name for name in current if name not in contracts]
 
-    def _add_contract(self, contract: Dict[str, Any]) -> None:
         with self.conn:
-            self.conn.execute("""
-                INSERT OR IGNORE INTO contracts (name, amount)
-                VALUES (?, ?)
-            """, (contract["name"], contract["amount"]))
+            self.conn.executemany(
+                "INSERT INTO contracts (guild_id, name, amount) VALUES (?, ?, ?)",
+                [(guild_id, name, contracts[name]) for name in changes["added"]]
+            )
+            self.conn.executemany(
+                "UPDATE contracts SET amount = ? WHERE guild_id = ? AND name = ?",
+                [(contracts[name], guild_id, name) for name in changes["updated"]]
+            )
+            self.conn.executemany(
+                "DELETE FROM contracts WHERE guild_id = ? AND name = ?",
+                [(guild_id, name) for name in changes["removed"]]
+            )
+        return changes
 
-    def get_contract_by_name(self, name: str) -> Optional[Dict[str, Any]]:
-        cursor = self.conn.execute("SELECT * FROM contracts WHERE name = ?", (name,))
+    def get_contract_by_name(self, guild_id: int, name: str) -> Optional[Dict[str, Any]]:
+        cursor = self.conn.execute(
+            "SELECT name, amount FROM contracts WHERE guild_id = ? AND name = ?", (guild_id, name)
+        )
         row = cursor.fetchone()
         if row:
             return dict(row)
         return None
 
-    def get_all_contracts(self) -> List[Dict[str, Any]]:
-        cursor = self.conn.execute("SELECT * FROM contracts")
+    def get_all_contracts(self, guild_id: int) -> List[Dict[str, Any]]:
+        cursor = self.conn.execute("SELECT name, amount FROM contracts WHERE guild_id = ?", (guild_id,))
         return [dict(row) for row in cursor.fetchall()]
 
-    def save_report(self, report: Dict[str, Any]) -> None:
-        participants_json = json.dumps(report["participants"], ensure_ascii=False)
+    def save_report(self, report: Dict[str, Any]) -> int:
+        """
+        Сохраняет отчёт вместе с участниками.
+        report["guild_id"] — сервер отчёта,
+        report["participants"] — список имён, report["participant_ids"] — (необязательно) их user_id
+        """
+        return self.save_reports([report])[0]
+
+    def save_reports(self, reports: List[Dict[str, Any]]) -> List[int]:
+        """Сохраняет пачку отчётов одной транзакцией и возвращает их id в том же порядке"""
+        if not reports:
+            return []
         with self.conn:
-            self.conn.execute("""
-                INSERT INTO reports (
-                    contract_name, author_id, author_name,
-                    participants, amount, fund, per_user, timestamp
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                report["contract_name"],
-                report["author_id"],
-                report["author_name"],
-                participants_json,
-                report["amount"],
-                report["fund"],
-                report["per_user"],
-                report["timestamp"]
-            ))
-
-    def get_reports_by_days(self, days: int) -> List[Dict[str, Any]]:
+            # id выдаём сами (сквозные по всем партициям), чтобы вставлять через executemany
+            self.conn.execute("BEGIN IMMEDIATE")
+            first_id = self.conn.execute("SELECT id FROM report_sequence").fetchone()[0] + 1
+            ids = list(range(first_id, first_id + len(reports)))
+            self.conn.execute("UPDATE report_sequence SET id = ?", (ids[-1],))
+            by_month = defaultdict(list)
+            for report_id, report in zip(ids, reports):
+                by_month[partition_month(report["timestamp"])].append((report_id, report))
+            for month, items in by_month.items():
+                reports_table, participants_table = self._writable_partition(month)
+                self.conn.executemany(f"""
+                    INSERT INTO {reports_table} (
+                        id, guild_id, contract_name, author_id, author_name,
+                        amount, fund, per_user, timestamp
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(
+                    report_id,
+                    report["guild_id"],
+                    report["contract_name"],
+                    report["author_id"],
+                    report["author_name"],
+                    report["amount"],
+                    report["fund"],
+                    report["per_user"],
+                    report["timestamp"]
+                ) for report_id, report in items])
+                self.conn.executemany(
+                    f"INSERT INTO {participants_table} (report_id, user_id, display_name) VALUES (?, ?, ?)",
+                    [
+                        (report_id, user_id, name)
+                        for report_id, report in items
+                        for user_id, name in zip(
+                            report.get("participant_ids") or [None] * len(report["participants"]),
+                            report["participants"]
+                        )
+                    ]
+                )
+                # Других отчётов с id из этого диапазона в партиции нет: id выданы только что
+                self._adjust_rollups("r.id BETWEEN ? AND ?", (items[0][0], items[-1][0]), 1,
+                                     reports_table, participants_table)
+        return ids
+
+    def get_reports_by_days(self, guild_id: int, days: int) -> List[Dict[str, Any]]:
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
         cutoff_iso = cutoff_date.isoformat()
-        cursor = self.conn.execute("""
-            SELECT * FROM reports WHERE timestamp >= ?
-        """, (cutoff_iso,))
-        rows = cursor.fetchall()
-        reports = []
-        for row in rows:
-            report = dict(row)
-            report["participants"] = json.loads(report["participants"])
-            reports.append(report)
-        return reports
-
-    def delete_reports_older_than(self, days: int) -> int:
+        reports = {}
+        with self._snapshot():
+            for month, schema in self._partitions(cutoff_date):
+                reports_table, participants_table = partition_tables(month, schema)
+                cursor = self.conn.execute(f"""
+                    SELECT * FROM {reports_table} WHERE guild_id = ? AND timestamp >= ? ORDER BY timestamp
+                """, (guild_id, cutoff_iso))
+                for row in cursor:
+                    report = dict(row)
+                    report["participants"] = []
+                    report["participant_ids"] = []
+                    reports[report["id"]] = report
+                cursor = self.conn.execute(f"""
+                    SELECT p.report_id, p.user_id, p.display_name
+                    FROM {reports_table} r JOIN {participants_table} p ON p.report_id = r.id
+                    WHERE r.guild_id = ? AND r.timestamp >= ?
+                """, (guild_id, cutoff_iso))
+                for report_id, user_id, display_name in cursor:
+                    report = reports.get(report_id)
+                    if report is not None:
+                        report["participants"].append(display_name)
+                        report["participant_ids"].append(user_id)
+        return list(reports.values())
+
+    def summarize_reports(self, guild_id: int, since: datetime, until: Optional[datetime] = None,
+                          group_by: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Считает итоги по отчётам сервера guild_id в окне [since, until) на стороне SQLite.
+        group_by: None, "day", "contract", "leader" (author_id) или "participant".
+        Возвращает общие суммы и список групп {key, label, reports, amount, fund, payout};
+        для участников payout — их заработок, amount/fund — суммы отчётов, где они участвовали.
+        Полные дни берутся из дневных итогов, сырые отчёты читаются только для неполных дней на краях окна.
+        """
+        if group_by is not None and group_by not in SUMMARY_GROUPS:
+            raise ValueError(f"Неизвестная группировка: {group_by}")
+
+        with self._snapshot():
+            source, params = self._summary_source(guild_id, since, until, None)
+            row = self.conn.execute(f"""
+                SELECT COALESCE(SUM(reports), 0) AS reports,
+                       COALESCE(SUM(amount), 0) AS amount,
+                       COALESCE(SUM(fund), 0) AS fund,
+                       COALESCE(SUM(payout), 0) AS payout
+                FROM ({source})
+            """, params).fetchone()
+            summary = {
+                "reports": row["reports"],
+                "total_amount": row["amount"],
+                "total_fund": row["fund"],
+                "total_payout": row["payout"],
+                "groups": []
+            }
+            if group_by is None or not summary["reports"]:
+                return summary
+
+            source, params = self._summary_source(guild_id, since, until, group_by)
+            cursor = self.conn.execute(f"""
+                SELECT key, MAX(label) AS label, SUM(reports) AS reports,
+                       SUM(amount) AS amount, SUM(fund) AS fund, SUM(payout) AS payout
+                FROM ({source})
+                GROUP BY key ORDER BY key
+            """, params)
+            summary["groups"] = [dict(row) for row in cursor]
+        return summary
+
+    def get_participant_earnings_page(self, guild_id: int, since: datetime, until: Optional[datetime] = None,
+                                      after: Optional[str] = None, before: Optional[str] = None,
+                                      limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Страница заработков участников за окно, упорядоченная по имени (keyset-пагинация):
+        after — следующая страница после этого имени, before — предыдущая перед ним.
+        Возвращает до limit строк {key, reports, payout} по возрастанию имени.
+        """
+        with self._snapshot():
+            source, params = self._summary_source(guild_id, since, until, "participant")
+            where, order = "", "ASC"
+            if after is not None:
+                where = "WHERE key > ?"
+                params.append(after)
+            elif before is not None:
+                where, order = "WHERE key < ?", "DESC"
+                params.append(before)
+            cursor = self.conn.execute(f"""
+                SELECT key, SUM(reports) AS reports, SUM(payout) AS payout
+                FROM ({source}) {where}
+                GROUP BY key ORDER BY key {order} LIMIT ?
+            """, (*params, limit))
+            rows = [dict(row) for row in cursor.fetchmany(limit)]
+        if order == "DESC":
+            rows.reverse()
+        return rows
+
+    def _summary_source(self, guild_id: int, since: datetime, until: Optional[datetime],
+                        group_by: Optional[str]):
+        """
+        Строит UNION ALL из строк (key, label, reports, amount, fund, payout):
+        дневные итоги для полных дней окна и агрегаты сырых отчётов для краёв.
+        """
+        since = since.astimezone(timezone.utc)
+        first_day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+        if first_day < since:
+            first_day += timedelta(days=1)
+        last_day = None
+        if until is not None:
+            until = until.astimezone(timezone.utc)
+            last_day = until.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        if group_by in ("contract", "leader") or (last_day is not None and last_day <= first_day):
+            # Без дневных итогов: всё окно по сырым отчётам
+            return self._raw_summary(guild_id, since, until, group_by)
+
+        parts, params = [], []
+        if first_day > since:
+            sql, args = self._raw_summary(guild_id, since, first_day, group_by)
+            parts.append(sql)
+            params.extend(args)
+
+        if group_by == "participant":
+            rollup = "SELECT display_name, display_name, reports, amount, fund, payout FROM daily_participant_totals"
+        else:
+            rollup = "SELECT day, day, reports, amount, fund, payout FROM daily_totals"
+        rollup += " WHERE guild_id = ? AND day >= ?"
+        params.extend((guild_id, first_day.date().isoformat()))
+        if last_day is not None:
+            rollup += " AND day < ?"
+            params.append(last_day.date().isoformat())
+        parts.append(rollup)
+
+        if last_day is not None and until > last_day:
+            sql, args = self._raw_summary(guild_id, last_day, until, group_by)
+            parts.append(sql)
+            params.extend(args)
+        return " UNION ALL ".join(parts), params
+
+    def _raw_summary(self, guild_id: int, since: datetime, until: Optional[datetime], group_by: Optional[str]):
+        """Агрегаты сырых отчётов окна: по одному подзапросу на каждую пересекающуюся партицию"""
+        where = "r.guild_id = ? AND r.timestamp >= ?"
+        window: List[Any] = [guild_id, since.isoformat()]
+        if until is not None:
+            where += " AND r.timestamp < ?"
+            window.append(until.isoformat())
+        key, label = SUMMARY_GROUPS.get(group_by, ("NULL", "NULL"))
+        parts, params = [], []
+        for month, schema in self._partitions(since, until):
+            reports_table, participants_table = partition_tables(month, schema)
+            if group_by == "participant":
+                source = f"{reports_table} r JOIN {participants_table} p ON p.report_id = r.id"
+                payout = "SUM(r.per_user)"
+            else:
+                source = f"{reports_table} r"
+                payout = f"SUM(r.per_user * (SELECT COUNT(*) FROM {participants_table} p WHERE p.report_id = r.id))"
+            sql = f"""
+                SELECT {key} AS key, {label} AS label, COUNT(*) AS reports,
+                       SUM(r.amount) AS amount, SUM(r.fund) AS fund, {payout} AS payout
+                FROM {source} WHERE {where}
+            """
+            if group_by is not None:
+                sql += f" GROUP BY {key}"
+            parts.append(sql)
+            params.extend(window)
+        if not parts:
+            return "SELECT NULL AS key, NULL AS label, 0 AS reports, 0 AS amount, 0 AS fund, 0 AS payout WHERE 0", []
+        return " UNION ALL ".join(parts), params
+
+    def _adjust_rollups(self, where: str, params: tuple, sign: int, reports: str, participants: str) -> None:
+        """
+        Прибавляет (sign=1) или вычитает (sign=-1) из дневных итогов отчёты партиции
+        (таблицы reports r и participants p), подходящие под условие `where`.
+        Вызывается внутри транзакции записи.
+        """
+        self.conn.execute(f"""
+            INSERT INTO daily_totals (guild_id, day, reports, amount, fund, payout)
+            SELECT r.guild_id, substr(r.timestamp, 1, 10), ? * COUNT(*), ? * SUM(r.amount), ? * SUM(r.fund),
+                   ? * SUM(r.per_user * (SELECT COUNT(*) FROM {participants} p WHERE p.report_id = r.id))
+            FROM {reports} r WHERE {where}
+            GROUP BY r.guild_id, substr(r.timestamp, 1, 10)
+            ON CONFLICT(guild_id, day) DO UPDATE SET
+                reports = reports + excluded.reports,
+                amount = amount + excluded.amount,
+                fund = fund + excluded.fund,
+                payout = payout + excluded.payout
+        """, (sign, sign, sign, sign, *params))
+        self.conn.execute(f"""
+            INSERT INTO daily_participant_totals (guild_id, day, display_name, reports, amount, fund, payout)
+            SELECT r.guild_id, substr(r.timestamp, 1, 10), p.display_name,
+                   ? * COUNT(*), ? * SUM(r.amount), ? * SUM(r.fund), ? * SUM(r.per_user)
+            FROM {reports} r JOIN {participants} p ON p.report_id = r.id
+            WHERE {where}
+            GROUP BY r.guild_id, substr(r.timestamp, 1, 10), p.display_name
+            ON CONFLICT(guild_id, day, display_name) DO UPDATE SET
+                reports = reports + excluded.reports,
+                amount = amount + excluded.amount,
+                fund = fund + excluded.fund,
+                payout = payout + excluded.payout
+        """, (sign, sign, sign, sign, *params))
+        if sign < 0:
+            self.conn.execute("DELETE FROM daily_totals WHERE reports <= 0")
+            self.conn.execute("DELETE FROM daily_participant_totals WHERE reports <= 0")
+
+    def rebuild_rollups(self) -> int:
+        """Пересчитывает дневные итоги с нуля по всем отчётам. Возвращает количество дней"""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("DELETE FROM daily_totals")
+            self.conn.execute("DELETE FROM daily_participant_totals")
+            for month, schema in self._partitions():
+                self._adjust_rollups("1", (), 1, *partition_tables(month, schema))
+            return self.conn.execute("SELECT COUNT(*) FROM daily_totals").fetchone()[0]
+
+    def delete_reports_older_than(self, guild_id: Optional[int], days: int) -> int:
+        """
+        Удаляет отчёты сервера guild_id старше `days` дней. Партиции общие для всех серверов,
+        поэтому здесь удаляются строки по индексу (guild_id, timestamp) партиций до порога.
+        guild_id=None — срок хранения для всех серверов: целые месяцы до порога уходят
+        вместе с партицией (DROP TABLE вместо построчного DELETE).
+        """
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
         cutoff_iso = cutoff_date.isoformat()
+        if guild_id is None:
+            return self._drop_reports_before(cutoff_date)
+        count = 0
         with self.conn:
-            cursor = self.conn.execute("DELETE FROM reports WHERE timestamp < ?", (cutoff_iso,))
-            return cursor.rowcount  # Возвращаем количество удалённых строк
+            self.conn.execute("BEGIN IMMEDIATE")
+            for month, schema in self._partitions(until=cutoff_date):
+                reports, participants = partition_tables(month, schema)
+                where, params = "r.guild_id = ? AND r.timestamp < ?", (guild_id, cutoff_iso)
+                self._adjust_rollups(where, params, -1, reports, participants)
+                self.conn.execute(f"""
+                    DELETE FROM {participants}
+                    WHERE report_id IN (SELECT id FROM {reports} r WHERE {where})
+                """, params)
+                cursor = self.conn.execute(f"DELETE FROM {reports} AS r WHERE {where}", params)
+                count += cursor.rowcount
+        return count  # Возвращаем количество удалённых отчётов
+
+    def _drop_reports_before(self, cutoff_date: datetime) -> int:
+        cutoff_iso = cutoff_date.isoformat()
+        cutoff_month = partition_month(cutoff_iso)
+        first_day = month_start(cutoff_month).date().isoformat()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            # Число удаляемых отчётов целых месяцев берём из дневных итогов, не считая строки
+            count = self.conn.execute(
+                "SELECT COALESCE(SUM(reports), 0) FROM daily_totals WHERE day < ?", (first_day,)
+            ).fetchone()[0]
+            self.conn.execute("DELETE FROM daily_totals WHERE day < ?", (first_day,))
+            self.conn.execute("DELETE FROM daily_participant_totals WHERE day < ?", (first_day,))
+            for month, schema in self._partitions():
+                if month >= cutoff_month:
+                    break
+                self._drop_partition(month, schema)
 
-    def delete_reports_by_date(self, date_str: str) -> int:
+            partition = self._partitions(cutoff_date, cutoff_date)
+            if partition:
+                reports, participants = partition_tables(*partition[0])
+                self._adjust_rollups("r.timestamp < ?", (cutoff_iso,), -1, reports, participants)
+                self.conn.execute(f"""
+                    DELETE FROM {participants}
+                    WHERE report_id IN (SELECT id FROM {reports} WHERE timestamp < ?)
+                """, (cutoff_iso,))
+                cursor = self.conn.execute(f"DELETE FROM {reports} WHERE timestamp < ?", (cutoff_iso,))
+                count += cursor.rowcount
+            return count
+
+    def delete_reports_by_date(self, guild_id: int, date_str: str) -> int:
         """
-        Удаляет отчёты за конкретный день.
+        Удаляет отчёты сервера guild_id за конкретный день.
         date_str должен быть в формате YYYY-MM-DD
         """
         start_dt = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
         end_dt = start_dt + timedelta(days=1)
-        start_iso = start_dt.isoformat()
-        end_iso = end_dt.isoformat()
+        params = (guild_id, start_dt.isoformat(), end_dt.isoformat())
         with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            # День сервера удаляется целиком, поэтому его итоги можно просто стереть
+            day = start_dt.date().isoformat()
+            self.conn.execute("DELETE FROM daily_totals WHERE guild_id = ? AND day = ?", (guild_id, day))
+            self.conn.execute(
+                "DELETE FROM daily_participant_totals WHERE guild_id = ? AND day = ?", (guild_id, day)
+            )
+            partition = self._partitions(start_dt, start_dt)
+            if not partition:
+                return 0
+            reports, participants = partition_tables(*partition[0])
+            self.conn.execute(f"""
+                DELETE FROM {participants}
+                WHERE report_id IN (SELECT id FROM {reports} WHERE guild_id = ? AND timestamp >= ? AND timestamp < ?)
+            """, params)
             cursor = self.conn.execute(
-                "DELETE FROM reports WHERE timestamp >= ? AND timestamp < ?",
-                (start_iso, end_iso)
+                f"DELETE FROM {reports} WHERE guild_id = ? AND timestamp >= ? AND timestamp < ?", params
             )
             return cursor.rowcount  # Возвращаем количество удалённых строк
 
-    def set_user_language(self, user_id: int, language: str) -> None:
+    def assign_legacy_guild(self, guild_id: int) -> int:
+        """
+        Переносит отчёты, сохранённые до поддержки нескольких серверов (LEGACY_GUILD_ID),
+        на сервер guild_id и пересчитывает дневные итоги. Возвращает число перенесённых отчётов.
+        """
+        count = 0
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for month, schema in self._partitions():
+                reports, _ = partition_tables(month, schema)
+                cursor = self.conn.execute(
+                    f"UPDATE {reports} SET guild_id = ? WHERE guild_id = ?", (guild_id, LEGACY_GUILD_ID)
+                )
+                count += cursor.rowcount
+        self.rebuild_rollups()
+        return count
+
+    def _drop_partition(self, month: str, schema: str) -> None:
+        """
+        Убирает партицию из каталога. Таблицы основной базы удаляются сразу (в той же транзакции),
+        архивные — при обслуживании (drop_orphan_archive_tables): транзакция над двумя файлами
+        в WAL не атомарна, а так читатель не увидит в каталоге месяц без таблиц.
+        """
+        self.conn.execute("DELETE FROM report_partitions WHERE month = ?", (month,))
+        if schema == "main":
+            reports, participants = partition_tables(month)
+            self.conn.execute(f"DROP TABLE IF EXISTS {participants}")
+            self.conn.execute(f"DROP TABLE IF EXISTS {reports}")
+
+    # --- Архив и обслуживание ---
+    def archive_partitions(self, before_month: str) -> List[str]:
+        """
+        Переносит в архив все партиции основной базы старше месяца before_month ('YYYY_MM').
+        Каждый месяц копируется в архив одной транзакцией, затем второй транзакцией
+        помечается архивным и удаляется из основной базы. Сбой между ними оставляет
+        данные на старом месте, повторный запуск перезапишет копию.
+        """
+        archived = []
+        for month, schema in self._partitions():
+            if month >= before_month:
+                break
+            if schema != "main":
+                continue
+            reports, participants = partition_tables(month)
+            archive_reports, archive_participants = partition_tables(month, ARCHIVE_SCHEMA)
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self.conn.execute(f"DROP TABLE IF EXISTS {archive_participants}")
+                self.conn.execute(f"DROP TABLE IF EXISTS {archive_reports}")
+                self._create_partition(month, ARCHIVE_SCHEMA)
+                columns = "id, guild_id, contract_name, author_id, author_name, amount, fund, per_user, timestamp"
+                self.conn.execute(
+                    f"INSERT INTO {archive_reports} ({columns}) SELECT {columns} FROM {reports} ORDER BY id"
+                )
+                self.conn.execute(f"""
+                    INSERT INTO {archive_participants} (report_id, user_id, display_name)
+                    SELECT report_id, user_id, display_name FROM {participants} ORDER BY report_id
+                """)
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self.conn.execute("UPDATE report_partitions SET archived = 1 WHERE month = ?", (month,))
+                self.conn.execute(f"DROP TABLE {participants}")
+                self.conn.execute(f"DROP TABLE {reports}")
+            archived.append(month)
+        return archived
+
+    def drop_orphan_archive_tables(self) -> List[str]:
+        """Удаляет из архива таблицы месяцев, которых уже нет в каталоге партиций"""
+        known = {row[0] for row in self.conn.execute("SELECT month FROM report_partitions WHERE archived = 1")}
+        tables = [row[0] for row in self.conn.execute(
+            f"SELECT name FROM {ARCHIVE_SCHEMA}.sqlite_master WHERE type = 'table' AND name LIKE 'report%'"
+        )]
+        dropped = set()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for table in tables:
+                month = table[-7:]
+                if _MONTH_RE.fullmatch(month) and month not in known:
+                    self.conn.execute(f"DROP TABLE {ARCHIVE_SCHEMA}.{table}")
+                    dropped.add(month)
+        return sorted(dropped)
+
+    def maintain(self, archive_after_months: int = 3, vacuum_threshold: float = 0.2) -> Dict[str, Any]:
+        """
+        Фоновое обслуживание: архивирует месяцы старше archive_after_months, удаляет
+        осиротевшие архивные таблицы, обновляет статистику планировщика (ANALYZE)
+        и делает VACUUM схем, где свободные страницы превышают vacuum_threshold.
+        """
+        current = partition_month(datetime.now(timezone.utc).isoformat())
+        result = {
+            "archived": self.archive_partitions(shift_month(current, -archive_after_months)),
+            "dropped": self.drop_orphan_archive_tables(),
+            "vacuumed": []
+        }
+        # Ограниченный ANALYZE: статистика по выборке, а не полный проход по индексам
+        self.conn.execute("PRAGMA analysis_limit = 1000")
+        self.conn.execute("ANALYZE")
+        for schema in ("main", ARCHIVE_SCHEMA):
+            pages = self.conn.execute(f"PRAGMA {schema}.page_count").fetchone()[0]
+            free = self.conn.execute(f"PRAGMA {schema}.freelist_count").fetchone()[0]
+            if pages and free / pages > vacuum_threshold:
+                self.conn.execute(f"VACUUM {schema}")
+                result["vacuumed"].append(schema)
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return result
+
+    def set_user_language(self, guild_id: int, user_id: int, language: str) -> None:
         with self.conn:
             self.conn.execute("""
-                INSERT INTO users (user_id, language) VALUES (?, ?)
-                ON CONFLICT(user_id) DO UPDATE SET language=excluded.language
-            """, (user_id, language))
+                INSERT INTO users (guild_id, user_id, language) VALUES (?, ?, ?)
+                ON CONFLICT(guild_id, user_id) DO UPDATE SET language=excluded.language
+            """, (guild_id, user_id, language))
 
-    def get_user_language(self, user_id: int) -> str:
-        cursor = self.conn.execute("SELECT language FROM users WHERE user_id = ?", (user_id,))
+    def get_user_language(self, guild_id: int, user_id: int) -> str:
+        language = self.find_user_language(guild_id, user_id)
+        if language is not None:
+            return language
+        return DEFAULT_LANGUAGE  # По умолчанию
+
+    def find_user_language(self, guild_id: int, user_id: int) -> Optional[str]:
+        """
+        Язык пользователя на сервере или None, если он его не выбирал.
+        Выбор, сделанный до поддержки нескольких серверов, действует на всех серверах.
+        """
+        cursor = self.conn.execute("""
+            SELECT language FROM users
+            WHERE guild_id IN (?, ?) AND user_id = ?
+            ORDER BY guild_id = ? DESC LIMIT 1
+        """, (guild_id, LEGACY_GUILD_ID, user_id, guild_id))
         row = cursor.fetchone()
-        if row:
-            return row["language"]
-        return "ru"  # По умолчанию
+        return row["language"] if row else None
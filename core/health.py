@@ -0,0 +1,80 @@
+import asyncio
+import collections
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from core.metrics import MetricsRegistry
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+
+class LoopLagMonitor:
+    """Измеряет задержку event loop: насколько позже запланированного просыпается sleep"""
+
+    def __init__(self, interval: float = 0.5, window: int = 120):
+        self.interval = interval
+        self.lag = 0.0
+        self._recent = collections.deque(maxlen=window)
+
+    @property
+    def max_lag(self) -> float:
+        """Максимальная задержка за последние window замеров"""
+        return max(self._recent, default=0.0)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - start - self.interval)
+            self._recent.append(self.lag)
+
+
+class HealthServer:
+    """
+    HTTP-сервер проверок здоровья внутри event loop бота (aiohttp уже идёт вместе с discord.py).
+    /        — ответ для пинга Cloudflare worker
+    /healthz — состояние: задержка gateway, лаг event loop, очередь записи в БД
+    /metrics — метрики в текстовом формате Prometheus
+    """
+
+    def __init__(self, health: Callable[[], Dict[str, Any]], metrics: MetricsRegistry,
+                 host: str = "0.0.0.0", port: int = 8080):
+        self.health = health
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._runner: Optional["web.AppRunner"] = None
+
+    async def index(self, request: "web.Request") -> "web.Response":
+        from aiohttp import web
+        return web.json_response({"status": "bot is running"})
+
+    async def healthz(self, request: "web.Request") -> "web.Response":
+        from aiohttp import web
+        data = self.health()
+        return web.json_response(data, status=200 if data["status"] != "down" else 503)
+
+    async def metrics_endpoint(self, request: "web.Request") -> "web.Response":
+        from aiohttp import web
+        return web.Response(
+            body=self.metrics.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+    async def start(self) -> None:
+        # aiohttp.web импортируется только при запуске сервера: main и утилиты не платят за него при импорте
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/", self.index)
+        app.router.add_get("/healthz", self.healthz)
+        app.router.add_get("/metrics", self.metrics_endpoint)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
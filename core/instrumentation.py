@@ -0,0 +1,187 @@
+import asyncio
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import discord
+
+from core.metrics import MetricsRegistry
+from core.startup import StartupClock
+
+# Discord ждёт первый ответ на взаимодействие не дольше 3 секунд
+INTERACTION_DEADLINE = 3.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0, 60.0)
+PHASES = ("db", "discord", "render")
+
+
+class Span:
+    """
+    Замер одного вызова команды или callback'а: время по фазам и момент первого ответа.
+    lock сериализует первый ответ, чтобы отложенный defer и обработчик не ответили дважды.
+    """
+
+    __slots__ = ("name", "phases", "first_response_at", "lock")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.phases: Dict[str, float] = {}
+        self.first_response_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("castello_span", default=None)
+
+
+def tracking() -> bool:
+    """Идёт ли замер команды; вне замера время фаз засекать незачем"""
+    return _current_span.get() is not None
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    """Добавляет время фазы к текущему замеру; вне команды ничего не делает"""
+    span = _current_span.get()
+    if span is not None:
+        span.phases[phase] = span.phases.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+def _mark_first_response() -> None:
+    span = _current_span.get()
+    if span is not None and span.first_response_at is None:
+        span.first_response_at = time.time()
+
+
+def _response_lock() -> asyncio.Lock:
+    span = _current_span.get()
+    return span.lock if span is not None else asyncio.Lock()
+
+
+async def respond(interaction, content: Optional[str] = None, **kwargs) -> Any:
+    """Отправляет ответ: первый — через interaction.response, последующие (и после defer) — через followup"""
+    async with _response_lock():
+        with phase("discord"):
+            if interaction.response.is_done():
+                return await interaction.followup.send(content, **kwargs)
+            _mark_first_response()
+            return await interaction.response.send_message(content, **kwargs)
+
+
+async def respond_edit(interaction, **kwargs) -> Any:
+    """Редактирует сообщение компонента: ответом на взаимодействие или, если ответ уже был, правкой оригинала"""
+    async with _response_lock():
+        with phase("discord"):
+            if interaction.response.is_done():
+                return await interaction.edit_original_response(**kwargs)
+            _mark_first_response()
+            return await interaction.response.edit_message(**kwargs)
+
+
+async def defer(interaction, ephemeral: bool = True) -> bool:
+    """
+    Откладывает ответ, если его ещё не было. Для компонентов — без нового сообщения
+    (потом respond_edit правит исходное), для slash-команд — «думает...» до первого followup.
+    Возвращает True, если defer действительно отправлен.
+    """
+    async with _response_lock():
+        if interaction.response.is_done():
+            return False
+        _mark_first_response()
+        with phase("discord"):
+            if interaction.type == discord.InteractionType.component:
+                await interaction.response.defer()
+            else:
+                await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+        return True
+
+
+def find_interaction(args, kwargs) -> Any:
+    for value in (*args, *kwargs.values()):
+        if hasattr(value, "response") and hasattr(value, "followup"):
+            return value
+    return None
+
+
+class Instrumentation:
+    """
+    Гистограммы задержек slash-команд и callback'ов компонентов с разбивкой
+    на время БД, Discord API и рендера, счётчики ошибок и просроченных ответов.
+    """
+
+    def __init__(self, metrics: MetricsRegistry, deadline: float = INTERACTION_DEADLINE,
+                 startup: Optional[StartupClock] = None):
+        self.deadline = deadline
+        # Отмечает first_interaction, когда обработано первое взаимодействие процесса
+        self.startup = startup
+        self.duration = metrics.histogram(
+            "command_duration_seconds", "Полное время обработки команды", LATENCY_BUCKETS
+        )
+        self.phase_duration = metrics.histogram(
+            "command_phase_seconds", "Время команды по фазам (db, discord, render)", LATENCY_BUCKETS
+        )
+        self.errors = metrics.counter("command_errors_total", "Необработанные исключения в командах")
+        self.deadline_misses = metrics.counter(
+            "interaction_deadline_misses_total", "Первый ответ позже 3 секунд или не отправлен вовсе"
+        )
+        self.deferrals = metrics.counter(
+            "interaction_deferrals_total", "Ответы, отложенные CommandRunner через defer"
+        )
+
+    def track(self, name: str) -> Callable:
+        """Декоратор для корутин-обработчиков (slash-команды, callback'и кнопок и select'ов)"""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                span = Span(name)
+                token = _current_span.set(span)
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    self.errors.inc(command=name)
+                    raise
+                finally:
+                    _current_span.reset(token)
+                    self._finish(span, time.perf_counter() - start, find_interaction(args, kwargs))
+            return wrapper
+        return decorator
+
+    def _finish(self, span: Span, elapsed: float, interaction) -> None:
+        self.duration.observe(elapsed, command=span.name)
+        if self.startup is not None and self.startup.mark("first_interaction"):
+            print(f"⏱ Первое взаимодействие обработано, от старта процесса: {self.startup.summary()}")
+        for name in PHASES:
+            self.phase_duration.observe(span.phases.get(name, 0.0), command=span.name, phase=name)
+        if interaction is None:
+            return
+        if span.first_response_at is not None:
+            late = span.first_response_at - interaction.created_at.timestamp() > self.deadline
+        else:
+            late = not interaction.response.is_done()
+        if late:
+            self.deadline_misses.inc(command=span.name)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Сводка по командам для /stats: вызовы, ошибки, p50/p95 и средние по фазам (в мс)"""
+        result = {}
+        for labels in self.duration.labelsets():
+            name = labels["command"]
+            result[name] = {
+                "calls": self.duration.count(command=name),
+                "errors": self.errors.value(command=name),
+                "misses": self.deadline_misses.value(command=name),
+                "p50": self.duration.quantile(0.5, command=name) * 1000,
+                "p95": self.duration.quantile(0.95, command=name) * 1000,
+                **{p: self.phase_duration.mean(command=name, phase=p) * 1000 for p in PHASES},
+            }
+        return result
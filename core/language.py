@@ -1,34 +1,151 @@
 import json
 import os
-from typing import Dict
+import time
+from string import Formatter
+from types import MappingProxyType
+from typing import Callable, Dict, FrozenSet, Mapping, Optional, Tuple
+
+from core.instrumentation import record_phase, tracking
+
+# Усі ключі каталогу та плейсхолдери, які має містити кожен переклад.
+# Новий рядок у languages/*.json спочатку додається сюди.
+CATALOG_SCHEMA: Mapping[str, FrozenSet[str]] = MappingProxyType({
+    "select_language": frozenset(),
+    "language_button_ru": frozenset(),
+    "language_button_ua": frozenset(),
+    "language_set_ru": frozenset(),
+    "language_set_ua": frozenset(),
+    "no_contracts_found": frozenset(),
+    "select_contract": frozenset(),
+    "contract_not_found": frozenset(),
+    "edit_participants_prompt": frozenset(),
+    "participants_empty": frozenset(),
+    "report_template": frozenset({"name", "amount", "leader", "participants", "fund", "per_user"}),
+    "report_saved": frozenset({"name"}),
+    "report_not_found": frozenset(),
+    "report_days_summary": frozenset({"days", "total", "fund", "payout", "earnings"}),
+    "report_days_page": frozenset({"page"}),
+    "report_days_incomplete": frozenset({"count"}),
+    "no_permission": frozenset(),
+    "cleanreports_deleted": frozenset({"count", "date"}),
+    "cleanreportsday_deleted": frozenset({"count", "date"}),
+    "invalid_date_format": frozenset(),
+    "contracts_reloaded": frozenset(),
+    "contracts_reload_changes": frozenset({"added", "updated", "removed"}),
+    "contracts_reload_cooldown": frozenset({"minutes"}),
+    "no_reports_found": frozenset(),
+    "stats_empty": frozenset(),
+    "stats_line": frozenset({"command", "calls", "errors", "misses", "p50", "p95", "db", "discord", "render"}),
+})
+
+
+# Перетворення, дозволені в плейсхолдерах (як у str.format)
+CONVERSIONS = frozenset({"r", "s", "a"})
+
+
+class Template:
+    """
+    Перевірений рядок каталогу. Формат розбирається й перевіряється один раз при завантаженні:
+    частини (літерал, поле, формат, перетворення), лише прості імена полів, без вкладених
+    плейсхолдерів. Після перевірки render — це text.format_map самого рядка: розбір формату
+    в C швидший за будь-яке збирання частин у Python.
+    """
+
+    __slots__ = ("key", "text", "fields", "parts", "render")
+
+    def __init__(self, key: str, text: str):
+        self.key = key
+        self.text = text
+        try:
+            parsed = list(Formatter().parse(text))
+        except ValueError as e:
+            raise ValueError(f"Ключ «{key}»: некоректний шаблон ({e})")
+        parts = []
+        for literal, field, spec, conversion in parsed:
+            if field is not None:
+                # Дозволені лише прості імена, без вкладених плейсхолдерів у форматі
+                if not field.isidentifier() or "{" in spec or (conversion and conversion not in CONVERSIONS):
+                    raise ValueError(f"Ключ «{key}»: недопустимий плейсхолдер {{{field}}}")
+            parts.append((literal, field, spec, conversion))
+        self.parts: Tuple[Tuple[str, Optional[str], Optional[str], Optional[str]], ...] = tuple(parts)
+        self.fields = frozenset(field for _, field, _, _ in parts if field is not None)
+        self.render: Callable[[Mapping[str, object]], str] = text.format_map
+
+    def __repr__(self) -> str:
+        return f"Template({self.key!r}, fields={sorted(self.fields)})"
+
 
 class LanguageManager:
     def __init__(self):
-        self.languages: Dict[str, Dict[str, str]] = {}
         self.default_language = "ru"
         self.supported_languages = ["ru", "ua"]
+        self.catalog: Mapping[Tuple[str, str], Template] = MappingProxyType({})
         self.load_languages()
 
     def load_languages(self) -> None:
-        """Завантажує всі доступні мовні файли з папки /languages"""
+        """
+        Завантажує мовні файли з папки /languages і розбирає їх у плаский незмінний каталог
+        (мова, ключ) -> Template. Ланцюжок fallback на мову за замовчуванням розв'язується тут же.
+        Відсутній ключ або невідповідні плейсхолдери — ValueError під час завантаження.
+        """
         base_path = os.path.join(os.path.dirname(__file__), "..", "languages")
+        raw: Dict[str, Dict[str, str]] = {}
         for lang_code in self.supported_languages:
             path = os.path.join(base_path, f"{lang_code}.json")
             if os.path.exists(path):
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        self.languages[lang_code] = json.load(f)
-                except Exception as e:
-                    print(f"[LanguageManager] ❌ Помилка при завантаженні {lang_code}.json: {e}")
+                with open(path, "r", encoding="utf-8") as f:
+                    raw[lang_code] = json.load(f)
+            elif lang_code == self.default_language:
+                raise ValueError(f"[LanguageManager] Файл мови за замовчуванням не знайдено: {path}")
             else:
-                print(f"[LanguageManager] ⚠️ Файл не знайдено: {path}")
+                print(f"[LanguageManager] ⚠️ Файл не знайдено: {path}, використовується «{self.default_language}»")
+                raw[lang_code] = {}
+
+        errors = []
+        catalog: Dict[Tuple[str, str], Template] = {}
+        for lang_code, texts in raw.items():
+            for key in texts.keys() - CATALOG_SCHEMA.keys():
+                errors.append(f"{lang_code}.json: невідомий ключ «{key}»")
+            for key, expected in CATALOG_SCHEMA.items():
+                source = lang_code if key in texts else self.default_language
+                text = raw[source].get(key)
+                if text is None:
+                    errors.append(f"{lang_code}.json: немає ключа «{key}»")
+                    continue
+                try:
+                    template = Template(key, text)
+                except ValueError as e:
+                    errors.append(f"{source}.json: {e}")
+                    continue
+                if template.fields != expected:
+                    errors.append(
+                        f"{source}.json: ключ «{key}» має плейсхолдери {sorted(template.fields)}, "
+                        f"очікувалися {sorted(expected)}"
+                    )
+                    continue
+                catalog[(lang_code, key)] = template
+        if errors:
+            raise ValueError("[LanguageManager] Помилки в мовних файлах:\n" + "\n".join(errors))
+        self.catalog = MappingProxyType(catalog)
+
+    def template(self, key: str, lang: str) -> Template:
+        """Повертає розібраний шаблон для ключа `key` мовою `lang` або fallback на 'ru'"""
+        template = self.catalog.get((lang, key))
+        if template is None:
+            template = self.catalog[(self.default_language, key)]
+        return template
 
     def get_text(self, key: str, lang: str) -> str:
         """Повертає текстовий рядок для ключа `key` мовою `lang` або fallback на 'ru'"""
-        if lang not in self.languages:
-            lang = self.default_language
-        text = self.languages.get(lang, {}).get(key)
-        if text is None:
-            print(f"[LanguageManager] ⚠️ Ключ «{key}» не знайдено для мови «{lang}»")
-            return f"[{key}]"
+        return self.template(key, lang).text
+
+    def render(self, key: str, lang: str, **values) -> str:
+        """Підставляє значення в шаблон; `values` мають містити всі плейсхолдери ключа"""
+        template = self.template(key, lang)
+        # Поза замером команди таймер лише сповільнював би рендер
+        if not tracking():
+            return template.render(values)
+        start = time.perf_counter()
+        text = template.render(values)
+        record_phase("render", time.perf_counter() - start)
         return text
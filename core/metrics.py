@@ -0,0 +1,172 @@
+import bisect
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Монотонный счётчик с метками; func — для счётчиков, которые ведутся в другом объекте"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, func: Optional[Callable[[], Optional[float]]] = None):
+        self.name = name
+        self.help = help_text
+        self.func = func
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self) -> Iterator[Tuple[str, Labels, float]]:
+        if self.func is not None:
+            value = self.func()
+            if value is not None:
+                yield self.name, (), value
+        for labels, value in self._values.items():
+            yield self.name, labels, value
+
+
+class Gauge:
+    """Текущее значение: задаётся через set() или вычисляется функцией при каждом чтении.
+
+    collect — для значений с метками, набор которых меняется (например, по шардам):
+    возвращает пары (метки, значение) на момент чтения.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, func: Optional[Callable[[], Optional[float]]] = None,
+                 collect: Optional[Callable[[], Iterable[Tuple[Dict[str, str], float]]]] = None):
+        self.name = name
+        self.help = help_text
+        self.func = func
+        self.collect = collect
+        self._values: Dict[Labels, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[tuple(sorted(labels.items()))] = value
+
+    def samples(self) -> Iterator[Tuple[str, Labels, float]]:
+        if self.func is not None:
+            value = self.func()
+            if value is not None:
+                yield self.name, (), value
+        if self.collect is not None:
+            for labels, value in self.collect():
+                yield self.name, tuple(sorted(labels.items())), value
+        for labels, value in self._values.items():
+            yield self.name, labels, value
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин и метками"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [счётчики по корзинам (последняя — +Inf), сумма, количество]
+        self._values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def labelsets(self) -> List[Dict[str, str]]:
+        return [dict(labels) for labels in self._values]
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(tuple(sorted(labels.items())))
+        return entry[2] if entry else 0
+
+    def mean(self, **labels: str) -> float:
+        entry = self._values.get(tuple(sorted(labels.items())))
+        return entry[1] / entry[2] if entry and entry[2] else 0.0
+
+    def quantile(self, q: float, **labels: str) -> float:
+        """Оценка квантиля по корзинам (линейная интерполяция, как histogram_quantile)"""
+        entry = self._values.get(tuple(sorted(labels.items())))
+        if not entry or not entry[2]:
+            return 0.0
+        rank = q * entry[2]
+        seen = 0
+        for index, bucket_count in enumerate(entry[0]):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def samples(self) -> Iterator[Tuple[str, Labels, float]]:
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", labels + (("le", _format_value(float(bound))),), cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса, отдаётся в текстовом формате Prometheus на /metrics"""
+
+    def __init__(self, prefix: str = "castello"):
+        self.prefix = prefix
+        self._metrics: List = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str,
+                func: Optional[Callable[[], Optional[float]]] = None) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", help_text, func))
+
+    def gauge(self, name: str, help_text: str,
+              func: Optional[Callable[[], Optional[float]]] = None,
+              collect: Optional[Callable[[], Iterable[Tuple[Dict[str, str], float]]]] = None) -> Gauge:
+        return self._register(Gauge(f"{self.prefix}_{name}", help_text, func, collect))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...]) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", help_text, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
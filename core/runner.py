@@ -0,0 +1,67 @@
+import asyncio
+import functools
+import time
+from typing import Callable
+
+import discord
+
+from core.instrumentation import INTERACTION_DEADLINE, Instrumentation, defer, find_interaction
+
+
+class CommandRunner:
+    """
+    Запускает обработчики команд и компонентов с автоматическим defer.
+
+    Обработчик выполняется отдельной задачей (работа с БД и так идёт в потоках
+    AsyncDatabaseManager). Если он не ответил за defer_after секунд от создания
+    взаимодействия — или p95 этой команды по гистограмме уже выше порога — runner
+    сам откладывает ответ, а respond()/respond_edit() обработчика уходят через followup.
+    Первый ответ сериализуется блокировкой замера, поэтому дважды ответить нельзя.
+    """
+
+    def __init__(self, instrumentation: Instrumentation, defer_after: float = 2.0, min_samples: int = 20):
+        if not 0 < defer_after < INTERACTION_DEADLINE:
+            raise ValueError(f"defer_after должен быть в интервале (0, {INTERACTION_DEADLINE})")
+        self.instrumentation = instrumentation
+        self.defer_after = defer_after
+        self.min_samples = min_samples
+        self.deferrals = instrumentation.deferrals
+
+    def is_slow(self, name: str) -> bool:
+        """Наблюдаемая стоимость команды: p95 выше порога при достаточном числе замеров"""
+        duration = self.instrumentation.duration
+        return (duration.count(command=name) >= self.min_samples
+                and duration.quantile(0.95, command=name) > self.defer_after)
+
+    def _defer_delay(self, name: str, interaction) -> float:
+        if self.is_slow(name):
+            return 0.0
+        age = time.time() - interaction.created_at.timestamp()
+        return min(self.defer_after, max(0.0, self.defer_after - age))
+
+    def command(self, name: str, ephemeral: bool = True) -> Callable:
+        """Декоратор: замер через Instrumentation.track плюс автоматический defer"""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                interaction = find_interaction(args, kwargs)
+                if interaction is None:
+                    return await func(*args, **kwargs)
+                # Задача копирует контекст, так что замер (и его блокировка ответа) общий
+                task = asyncio.ensure_future(func(*args, **kwargs))
+                try:
+                    delay = self._defer_delay(name, interaction)
+                    if delay:
+                        await asyncio.wait((task,), timeout=delay)
+                    if not task.done():
+                        try:
+                            if await defer(interaction, ephemeral=ephemeral):
+                                self.deferrals.inc(command=name)
+                        except discord.HTTPException as e:
+                            print(f"[CommandRunner] ⚠️ Не удалось отложить ответ «{name}»: {e}")
+                    return await task
+                except asyncio.CancelledError:
+                    task.cancel()
+                    raise
+            return self.instrumentation.track(name)(wrapper)
+        return decorator
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+
+import discord
+from discord import app_commands
+
+from core.metrics import Gauge
+
+
+def process_age() -> Optional[float]:
+    """Сколько секунд назад ОС запустила процесс (Linux, /proc); на других системах — None"""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # starttime — 22-е поле; имя процесса в скобках может содержать пробелы
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupClock:
+    """
+    Время от старта процесса (включая запуск интерпретатора и импорты) до этапов запуска бота:
+    imported, setup_hook, ready, first_interaction. Каждый этап отмечается один раз.
+    Без /proc отсчёт идёт от создания часов.
+    """
+
+    def __init__(self, gauge: Optional[Gauge] = None):
+        age = process_age()
+        self.origin = time.monotonic() - (age or 0.0)
+        self.gauge = gauge
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, name: str) -> bool:
+        """Отмечает этап; False, если он уже был отмечен (например, ready после переподключения)"""
+        if name in self.marks:
+            return False
+        self.marks[name] = time.monotonic() - self.origin
+        if self.gauge is not None:
+            self.gauge.set(self.marks[name], phase=name)
+        return True
+
+    def summary(self) -> str:
+        return ", ".join(f"{name} {seconds:.2f} с" for name, seconds in self.marks.items())
+
+
+def command_tree_hash(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Хеш команд в том виде, в каком tree.sync отправляет их в Discord"""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command.get("type", 1), command["name"])
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class CommandTreeSync:
+    """
+    Синхронизирует дерево slash-команд с Discord, только если оно изменилось.
+    Хеш последнего отправленного дерева хранится в JSON-файле по цели:
+    "global" для глобальных команд или id сервера для синхронизации в режиме разработки.
+    """
+
+    def __init__(self, tree: app_commands.CommandTree, path: str):
+        self.tree = tree
+        self.path = path
+
+    def _load(self) -> Dict[str, str]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _store(self, hashes: Dict[str, str]) -> None:
+        # Через временный файл: оборванная запись не оставит битый JSON
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(hashes, f, indent=2)
+        os.replace(tmp, self.path)
+
+    async def sync(self, guild: Optional[discord.abc.Snowflake] = None, force: bool = False) -> bool:
+        """Возвращает True, если дерево было отправлено в Discord"""
+        target = "global" if guild is None else str(guild.id)
+        digest = command_tree_hash(self.tree, guild)
+        hashes = self._load()
+        if not force and hashes.get(target) == digest:
+            return False
+        await self.tree.sync(guild=guild)
+        hashes[target] = digest
+        self._store(hashes)
+        return True
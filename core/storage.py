@@ -0,0 +1,152 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from core.cache import LRUCache, MISSING
+from core.database_sqlite import DEFAULT_LANGUAGE
+
+BACKENDS = ("sqlite", "postgres")
+
+
+class Storage(ABC):
+    """
+    Интерфейс хранилища бота: контракты, отчёты, настройки пользователей и срок хранения.
+    Реализации: AsyncDatabaseManager (SQLite) и PostgresStorage (asyncpg, пул соединений).
+    Все методы — корутины; семантика (окна [since, until), порядок ключей, guild_id)
+    одинакова для всех бэкендов и проверяется benchmarks/check_storage.py.
+
+    Языки пользователей кешируются здесь же, в LRU с TTL (включая негативные записи для тех,
+    кто язык не выбирал); set_user_language обновляет кеш после записи в хранилище.
+    """
+
+    def __init__(self, language_cache_size: int = 10000, language_cache_ttl: float = 3600):
+        self.language_cache = LRUCache(language_cache_size, language_cache_ttl)
+        # Время (unix) последней успешной записи, для /healthz
+        self.last_write_at: Optional[float] = None
+        # Неудачные попытки записать отчёт (каждая неудача отдельного отчёта)
+        self.failed_writes = 0
+
+    async def start(self) -> None:
+        """Подключение и подготовка схемы; вызывается в setup_hook до первой команды"""
+
+    async def flush(self) -> None:
+        """Дожидается записи всех отложенных отчётов"""
+
+    async def aclose(self) -> None:
+        """Завершение работы внутри event loop: дописывает отложенное и освобождает соединения"""
+        await self.flush()
+
+    @abstractmethod
+    def close(self) -> None:
+        """Синхронное закрытие после остановки event loop (повторный вызов безопасен)"""
+
+    @property
+    def queue_depth(self) -> int:
+        """Отчёты, принятые save_report, но ещё не записанные"""
+        return 0
+
+    @property
+    def retrying_reports(self) -> int:
+        """Отчёты, запись которых не удалась и ждёт повтора"""
+        return 0
+
+    def retrying_reports_for(self, guild_id: int) -> int:
+        """Отчёты сервера из очереди повторов: сводки их ещё не видят"""
+        return 0
+
+    # --- Контракты ---
+    @abstractmethod
+    async def load_contracts_from_file(self, guild_id: int, filename: str) -> Dict[str, List[str]]:
+        """Синхронизирует контракты сервера с файлом, возвращает {"added", "updated", "removed"}"""
+
+    @abstractmethod
+    async def get_contract_by_name(self, guild_id: int, name: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def get_all_contracts(self, guild_id: int) -> List[Dict[str, Any]]:
+        ...
+
+    # --- Отчёты ---
+    @abstractmethod
+    async def save_report(self, report: Dict[str, Any]) -> None:
+        """Сохраняет отчёт (guild_id, contract_name, author_*, participants, participant_ids, суммы, timestamp)"""
+
+    @abstractmethod
+    async def get_reports_by_days(self, guild_id: int, days: int) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def summarize_reports(self, guild_id: int, since: datetime, until: Optional[datetime] = None,
+                                group_by: Optional[str] = None) -> Dict[str, Any]:
+        """Итоги окна [since, until); group_by: None, "day", "contract", "leader" или "participant\""""
+
+    @abstractmethod
+    async def get_participant_earnings_page(self, guild_id: int, since: datetime, until: Optional[datetime] = None,
+                                            after: Optional[str] = None, before: Optional[str] = None,
+                                            limit: int = 20) -> List[Dict[str, Any]]:
+        """Keyset-страница заработков участников, по возрастанию имени (бинарное сравнение)"""
+
+    # --- Срок хранения и обслуживание ---
+    @abstractmethod
+    async def delete_reports_older_than(self, guild_id: Optional[int], days: int) -> int:
+        """Удаляет отчёты сервера старше days дней; guild_id=None — для всех серверов"""
+
+    @abstractmethod
+    async def delete_reports_by_date(self, guild_id: int, date_str: str) -> int:
+        ...
+
+    @abstractmethod
+    async def maintain(self, archive_after_months: int = 3, vacuum_threshold: float = 0.2) -> Dict[str, Any]:
+        """Фоновое обслуживание, возвращает {"archived", "dropped", "vacuumed"}"""
+
+    # --- Пользователи ---
+    @abstractmethod
+    async def find_user_language(self, guild_id: int, user_id: int) -> Optional[str]:
+        """Язык пользователя на сервере без кеша или None, если он его не выбирал"""
+
+    @abstractmethod
+    async def store_user_language(self, guild_id: int, user_id: int, language: str) -> None:
+        ...
+
+    async def set_user_language(self, guild_id: int, user_id: int, language: str) -> None:
+        await self.store_user_language(guild_id, user_id, language)
+        self.language_cache.put((guild_id, user_id), language)
+
+    async def get_user_language(self, guild_id: int, user_id: int) -> str:
+        key = (guild_id, user_id)
+        language = self.language_cache.get(key)
+        if language is MISSING:
+            language = await self.find_user_language(guild_id, user_id)
+            # None тоже кешируется: повторный запрос для пользователя без настройки не нужен
+            self.language_cache.put_if_absent(key, language)
+        return DEFAULT_LANGUAGE if language is None else language
+
+
+def create_storage(config) -> Storage:
+    """Создаёт хранилище по настройкам Config (DATABASE_BACKEND и параметры бэкенда)"""
+    backend = config.DATABASE_BACKEND
+    cache = {
+        "language_cache_size": config.USER_LANGUAGE_CACHE_SIZE,
+        "language_cache_ttl": config.USER_LANGUAGE_CACHE_TTL_SECONDS,
+    }
+    if backend == "sqlite":
+        from core.async_database import AsyncDatabaseManager
+        return AsyncDatabaseManager(
+            config.DATABASE_PATH,
+            readers=config.DB_READER_POOL_SIZE,
+            batch_size=config.REPORT_BATCH_SIZE,
+            flush_delay=config.REPORT_FLUSH_DELAY_MS / 1000,
+            retry_delay=config.REPORT_RETRY_DELAY_SECONDS,
+            max_retry_delay=config.REPORT_RETRY_MAX_DELAY_SECONDS,
+            **cache
+        )
+    if backend == "postgres":
+        from core.database_postgres import PostgresStorage
+        return PostgresStorage(
+            config.DATABASE_URL,
+            min_size=config.DB_POOL_MIN_SIZE,
+            max_size=config.DB_POOL_MAX_SIZE,
+            **cache
+        )
+    raise ValueError(f"Неизвестный DATABASE_BACKEND: {backend!r} (допустимо: {', '.join(BACKENDS)})")
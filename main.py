@@ -1,164 +1,326 @@
-import os
 import json
+import asyncio
+import math
+import signal
 from dotenv import load_dotenv
 load_dotenv()
 
 from datetime import datetime, timezone, timedelta
-from threading import Thread
-from typing import List
+from typing import Mapping, Sequence
 
 import discord
 from discord.ext import commands
 from discord import app_commands
-from flask import Flask, jsonify
 
-from core.database_sqlite import DatabaseManager
+from core.contracts import ContractRegistry, contract_key
+from core.database_sqlite import LEGACY_GUILD_ID
+from core.health import HealthServer, LoopLagMonitor
+from core.instrumentation import Instrumentation, phase, respond, respond_edit
+from core.metrics import MetricsRegistry
+from core.runner import CommandRunner
+from core.startup import CommandTreeSync, StartupClock
+from core.storage import create_storage
 from core.language import LanguageManager
 from config import Config
 
+# Участники выбираются через UserSelect, поэтому содержимое сообщений боту не нужно
 intents = discord.Intents.default()
-intents.message_content = True
-intents.messages = True
 intents.guilds = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
-db = DatabaseManager()
+class CastelloBot(commands.AutoShardedBot):
+    async def setup_hook(self):
+        # Один раз на процесс, до подключения к gateway: только критичное, остальное — после on_ready
+        install_shutdown_handler()
+        await start_core_services()
+        startup.mark("setup_hook")
+        start_background(start_deferred_services())
+
+    async def close(self):
+        # Дописываем отложенные отчёты и закрываем соединения, пока event loop ещё жив
+        await db.aclose()
+        await health_server.stop()
+        await super().close()
+
+# Без SHARD_COUNT число шардов выбирает Discord; SHARD_IDS позволяет разнести шарды по процессам
+bot = CastelloBot(command_prefix="!", intents=intents, shard_count=Config.SHARD_COUNT, shard_ids=Config.SHARD_IDS)
+# SQLite или PostgreSQL — по Config.DATABASE_BACKEND
+db = create_storage(Config)
 lang_manager = LanguageManager()
+contracts = ContractRegistry(
+    db,
+    Config.CONTRACTS_JSON_PATH,
+    guild_dir=Config.CONTRACTS_GUILD_DIR,
+    cooldown_minutes=Config.CONTRACTS_RELOAD_COOLDOWN_MINUTES
+)
+
+def guild_of(interaction: discord.Interaction) -> int:
+    """Сервер взаимодействия; вне сервера (личные сообщения) — общий LEGACY_GUILD_ID"""
+    return interaction.guild_id or LEGACY_GUILD_ID
+
+# Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора
+background_tasks = set()
+
+def start_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def install_shutdown_handler() -> None:
+    """
+    Платформа (Procfile) останавливает бота сигналом SIGTERM, а Client.run обрабатывает
+    только KeyboardInterrupt: без обработчика процесс умер бы, не дописав очередь отчётов.
+    SIGTERM закрывает бота так же, как Ctrl+C — через close().
+    """
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: start_background(bot.close()))
+    except NotImplementedError:
+        pass  # Windows: сигналы в event loop не поддерживаются
+
+async def maintain_database(interval: float) -> None:
+    """Фоновое обслуживание БД: срок хранения, архивирование холодных месяцев, ANALYZE, VACUUM"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if Config.REPORT_RETENTION_DAYS is not None:
+                deleted = await db.delete_reports_older_than(None, Config.REPORT_RETENTION_DAYS)
+                if deleted:
+                    print(f"🧹 Срок хранения {Config.REPORT_RETENTION_DAYS} дн.: удалено отчётов {deleted}")
+            result = await db.maintain(Config.REPORT_ARCHIVE_AFTER_MONTHS)
+            if result["archived"] or result["dropped"] or result["vacuumed"]:
+                print(f"🧹 Обслуживание БД: в архив {result['archived']}, "
+                      f"удалено из архива {result['dropped']}, VACUUM {result['vacuumed']}")
+        except Exception as e:
+            print(f"❌ Ошибка обслуживания БД: {e}")
+
+# --- Health-check и метрики (HTTP-сервер внутри event loop бота) ---
+loop_lag = LoopLagMonitor()
+metrics = MetricsRegistry()
+startup = StartupClock(metrics.gauge("startup_seconds", "Секунды от старта процесса до этапа запуска"))
+metrics.gauge("gateway_latency_seconds", "Задержка heartbeat gateway Discord",
+              lambda: bot.latency if math.isfinite(bot.latency) else None)
+metrics.gauge("gateway_shard_latency_seconds", "Задержка heartbeat gateway Discord по шардам",
+              collect=lambda: [({"shard": str(shard_id)}, latency)
+                               for shard_id, latency in shard_latencies().items()
+                               if math.isfinite(latency)])
+metrics.gauge("event_loop_lag_seconds", "Последний замер лага event loop", lambda: loop_lag.lag)
+metrics.gauge("event_loop_lag_max_seconds", "Максимальный лаг event loop за последнюю минуту", lambda: loop_lag.max_lag)
+metrics.gauge("db_queue_depth", "Отчёты, ожидающие записи в БД", lambda: db.queue_depth)
+metrics.gauge("db_reports_retrying", "Отчёты, запись которых не удалась и ждёт повтора", lambda: db.retrying_reports)
+metrics.counter("db_report_write_failures_total", "Неудачные попытки записать отчёт", lambda: db.failed_writes)
+metrics.gauge("db_last_write_timestamp_seconds", "Время последней успешной записи в БД", lambda: db.last_write_at)
+metrics.counter("language_cache_hits_total", "Попадания в кеш языков", lambda: db.language_cache.hits)
+metrics.counter("language_cache_misses_total", "Промахи кеша языков", lambda: db.language_cache.misses)
+metrics.gauge("contracts_loaded", "Контрактов в каталоге", contracts.size)
+metrics.counter("contracts_lookup_hits_total", "Найденные в каталоге контракты", lambda: contracts.hits)
+metrics.counter("contracts_lookup_misses_total", "Не найденные в каталоге контракты", lambda: contracts.misses)
+
+def shard_latencies() -> dict:
+    """Задержка heartbeat каждого шарда; закрытый шард — inf"""
+    return {shard_id: float("inf") if shard.is_closed() else shard.latency
+            for shard_id, shard in bot.shards.items()}
+
+
+def gateway_healthy() -> bool:
+    # У AutoShardedBot is_ready() не сбрасывается при обрыве шардов, а bot.latency —
+    # среднее по шардам, поэтому смотрим на каждый шард отдельно
+    latencies = list(shard_latencies().values()) or [bot.latency]
+    return all(math.isfinite(latency) and latency <= Config.HEALTH_MAX_GATEWAY_LATENCY_SECONDS
+               for latency in latencies)
+
+
+def health_status() -> dict:
+    if bot.is_closed():
+        status = "down"
+    elif not bot.is_ready():
+        status = "starting"
+    elif (not gateway_healthy() or loop_lag.max_lag > Config.HEALTH_MAX_LOOP_LAG_SECONDS
+          or db.retrying_reports):
+        status = "degraded"
+    else:
+        status = "ok"
+    last_write = db.last_write_at
+    return {
+        "status": status,
+        "time": datetime.now(timezone.utc).isoformat(),
+        "gateway_latency_ms": round(bot.latency * 1000, 1) if math.isfinite(bot.latency) else None,
+        "gateway_shard_latency_ms": {str(shard_id): round(latency * 1000, 1) if math.isfinite(latency) else None
+                                     for shard_id, latency in shard_latencies().items()},
+        "event_loop_lag_ms": round(loop_lag.lag * 1000, 1),
+        "event_loop_lag_max_ms": round(loop_lag.max_lag * 1000, 1),
+        "db_queue_depth": db.queue_depth,
+        "db_reports_retrying": db.retrying_reports,
+        "db_report_write_failures": db.failed_writes,
+        "db_last_write": datetime.fromtimestamp(last_write, timezone.utc).isoformat() if last_write else None,
+        "startup_seconds": {name: round(seconds, 3) for name, seconds in startup.marks.items()},
+    }
+
+health_server = HealthServer(health_status, metrics, host=Config.HOST, port=Config.PORT)
+instrumentation = Instrumentation(metrics, startup=startup)
+command_sync = CommandTreeSync(bot.tree, Config.COMMAND_TREE_HASH_PATH)
+runner = CommandRunner(instrumentation, defer_after=Config.INTERACTION_DEFER_AFTER_SECONDS)
+
+async def start_core_services():
+    """Всё, без чего не обработать первое взаимодействие: хранилище, health-check, каталог контрактов, компоненты"""
+    await db.start()
+    await health_server.start()
+    await contracts.load()
+    bot.add_dynamic_items(ContractSelect, AddParticipantsButton, ParticipantSelect)
+
+async def sync_commands():
+    """Отправляет дерево команд в Discord, только если оно изменилось; в режиме разработки — на DEV_GUILD_ID"""
+    guild = None
+    if Config.DEV_GUILD_ID:
+        guild = discord.Object(id=Config.DEV_GUILD_ID)
+        bot.tree.copy_global_to(guild=guild)
+    try:
+        if await command_sync.sync(guild=guild, force=Config.COMMAND_SYNC_FORCE):
+            print(f"🔄 Команды синхронизированы ({'сервер ' + str(guild.id) if guild else 'глобально'})")
+    except (discord.HTTPException, OSError) as e:
+        print(f"❌ Ошибка синхронизации команд: {e}")
+
+async def start_deferred_services():
+    """Некритичное откладывается до подключения к gateway: синхронизация команд и фоновые задачи"""
+    await bot.wait_until_ready()
+    start_background(loop_lag.run())
+    start_background(contracts.watch(Config.CONTRACTS_WATCH_INTERVAL_SECONDS))
+    start_background(maintain_database(Config.DB_MAINTENANCE_INTERVAL_HOURS * 3600))
+    await sync_commands()
+
+# --- Постоянные компоненты отчёта ---
+# Всё состояние (язык, ключ контракта) закодировано в custom_id, а сами компоненты
+# регистрируются один раз в setup_hook через add_dynamic_items. В памяти не остаётся
+# ни объектов View, ни замыканий на каждое сообщение, и кнопки переживают перезапуск.
+
+class ParticipantSelect(discord.ui.DynamicItem[discord.ui.UserSelect],
+                        template=r"castello:participants_select:(?P<lang>[a-z]{2}):(?P<key>[0-9a-f]{12})"):
+    """Выбор участников: отчёт собирается в callback, без слушателя сообщений"""
+
+    def __init__(self, lang: str, key: str):
+        super().__init__(discord.ui.UserSelect(
+            custom_id=f"castello:participants_select:{lang}:{key}",
+            placeholder=lang_manager.get_text("edit_participants_prompt", lang),
+            min_values=1,
+            max_values=Config.MAX_REPORT_PARTICIPANTS
+        ))
+        self.lang = lang
+        self.key = key
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.UserSelect, match):
+        return cls(match["lang"], match["key"])
+
+    @runner.command("participants_select")
+    async def callback(self, interaction: discord.Interaction):
+        participants = self.item.values
+        if not participants:
+            await respond_edit(interaction, content=lang_manager.get_text("participants_empty", self.lang), view=None)
+            return
 
-# Загрузка контрактов из JSON
-CONTRACTS_JSON = Config.CONTRACTS_JSON_PATH
-if os.path.exists(CONTRACTS_JSON):
-    db.load_contracts_from_file(CONTRACTS_JSON)
+        contract = contracts.get_by_key(guild_of(interaction), self.key)
+        if not contract:
+            await respond_edit(interaction, content=lang_manager.get_text("contract_not_found", self.lang), view=None)
+            return
 
-# --- Flask для UptimeRobot ---
-app = Flask('')
+        author_id = interaction.user.id
+        author_name = interaction.user.display_name
 
-@app.route('/')
-def index():
-    return jsonify({"status": "bot is running"}), 200
+        participant_names = [u.display_name for u in participants]
+        participants_text = "\n".join(f"• {name}" for name in participant_names)
+
+        fund = contract["amount"] * Config.FUND_PERCENTAGE
+        per_user = (contract["amount"] - fund) / len(participant_names)
 
-@app.route('/healthz')
-def healthz():
-    return jsonify({"status": "ok", "time": datetime.now(timezone.utc).isoformat()}), 200
+        report_text = lang_manager.render("report_template", self.lang,
+            name=contract["name"],
+            amount=contract["amount"],
+            leader=author_name,
+            participants=participants_text,
+            fund=f"{fund:.2f}",
+            per_user=f"{per_user:.2f}"
+        )
 
-def run_flask():
-    app.run(host=Config.HOST, port=Config.PORT)
+        with phase("discord"):
+            await interaction.channel.send(report_text)
 
-def keep_alive():
-    Thread(target=run_flask, daemon=True).start()
+        report = {
+            "guild_id": guild_of(interaction),
+            "contract_name": contract["name"],
+            "author_id": author_id,
+            "author_name": author_name,
+            "participants": participant_names,
+            "participant_ids": [u.id for u in participants],
+            "amount": contract["amount"],
+            "fund": fund,
+            "per_user": per_user,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+        await db.save_report(report)
+
+        await respond_edit(
+            interaction,
+            content=lang_manager.render("report_saved", self.lang, name=contract["name"]),
+            view=None
+        )
 
 # --- Кнопка "Добавить участников" ---
-class AddParticipantsButton(discord.ui.Button):
-    def __init__(self, contract_name: str, lang: str):
-        super().__init__(label="➕ Добавить участников", style=discord.ButtonStyle.primary)
-        self.contract_name = contract_name
+class AddParticipantsButton(discord.ui.DynamicItem[discord.ui.Button],
+                            template=r"castello:participants:(?P<lang>[a-z]{2}):(?P<key>[0-9a-f]{12})"):
+    def __init__(self, lang: str, key: str):
+        super().__init__(discord.ui.Button(
+            label="➕ Добавить участников",
+            style=discord.ButtonStyle.primary,
+            custom_id=f"castello:participants:{lang}:{key}"
+        ))
         self.lang = lang
+        self.key = key
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["lang"], match["key"])
+
+    @runner.command("add_participants")
     async def callback(self, interaction: discord.Interaction):
-        await interaction.response.send_message(
+        view = discord.ui.View(timeout=None)
+        view.add_item(ParticipantSelect(self.lang, self.key))
+        await respond(
+            interaction,
             lang_manager.get_text("edit_participants_prompt", self.lang),
+            view=view,
             ephemeral=True
         )
 
-        def check(m: discord.Message):
-            return m.author == interaction.user and m.channel == interaction.channel
-
-        try:
-            msg = await bot.wait_for("message", check=check, timeout=60)
-            mentions = msg.mentions
-            try:
-                await msg.delete()
-            except discord.Forbidden:
-                pass
-
-            if not mentions:
-                await interaction.followup.send(lang_manager.get_text("participants_empty", self.lang), ephemeral=True)
-                return
-
-            contract = db.get_contract_by_name(self.contract_name)
-            if not contract:
-                await interaction.followup.send(lang_manager.get_text("contract_not_found", self.lang), ephemeral=True)
-                return
-
-            author_id = interaction.user.id
-            author_name = interaction.user.display_name
-
-            participant_names = [u.display_name for u in mentions]
-            participants_text = "\n".join(f"• {name}" for name in participant_names)
-
-            fund = contract["amount"] * Config.FUND_PERCENTAGE
-            per_user = (contract["amount"] - fund) / len(participant_names)
-
-            report_text = lang_manager.get_text("report_template", self.lang).format(
-                name=contract["name"],
-                amount=contract["amount"],
-                leader=author_name,
-                participants=participants_text,
-                fund=f"{fund:.2f}",
-                per_user=f"{per_user:.2f}"
-            )
-
-            await interaction.channel.send(report_text)
-
-            report = {
-                "contract_name": contract["name"],
-                "author_id": author_id,
-                "author_name": author_name,
-                "participants": participant_names,
-                "amount": contract["amount"],
-                "fund": fund,
-                "per_user": per_user,
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            }
-            db.save_report(report)
-
-            await interaction.followup.send(
-                lang_manager.get_text("report_saved", self.lang).format(name=contract["name"]),
-                ephemeral=True
-            )
-
-        except Exception:
-            await interaction.followup.send(lang_manager.get_text("participants_empty", self.lang), ephemeral=True)
-
 # --- Select контракта ---
-class ContractSelect(discord.ui.Select):
-    def __init__(self, contracts: List[dict], lang: str, callback):
+class ContractSelect(discord.ui.DynamicItem[discord.ui.Select], template=r"castello:contract:(?P<lang>[a-z]{2})"):
+    def __init__(self, lang: str, contracts: Sequence[Mapping] = ()):
+        # При маршрутизации нажатия опции не нужны: выбранное значение приходит во взаимодействии
         options = [
             discord.SelectOption(label=c["name"], description=f'{c["amount"]} USD', value=c["name"])
             for c in contracts[:Config.MAX_CONTRACTS_DISPLAY]
         ]
-        super().__init__(placeholder=lang_manager.get_text("select_contract", lang), options=options)
-        self.callback_func = callback
+        super().__init__(discord.ui.Select(
+            custom_id=f"castello:contract:{lang}",
+            placeholder=lang_manager.get_text("select_contract", lang),
+            options=options
+        ))
         self.lang = lang
 
-    async def callback(self, interaction: discord.Interaction):
-        await self.callback_func(interaction, self.values[0], self.lang)
-
-class ContractSelectView(discord.ui.View):
-    def __init__(self, contracts: List[dict], lang: str, callback):
-        super().__init__(timeout=120)
-        self.add_item(ContractSelect(contracts, lang, callback))
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls(match["lang"])
 
-# --- Команда /report ---
-@bot.tree.command(name="report", description="📄 Отчёт по контракту")
-async def report(interaction: discord.Interaction):
-    lang = db.get_user_language(interaction.user.id)
-    contracts = db.get_all_contracts()
-    if not contracts:
-        await interaction.response.send_message(lang_manager.get_text("no_contracts_found", lang), ephemeral=True)
-        return
-
-    async def on_select(inter: discord.Interaction, contract_name: str, lang: str):
-        contract = db.get_contract_by_name(contract_name)
+    @runner.command("contract_select")
+    async def callback(self, interaction: discord.Interaction):
+        contract = contracts.get(guild_of(interaction), self.item.values[0])
         if not contract:
-            await inter.response.send_message(lang_manager.get_text("contract_not_found", lang), ephemeral=True)
+            await respond(interaction, lang_manager.get_text("contract_not_found", self.lang), ephemeral=True)
             return
 
         fund = contract["amount"] * Config.FUND_PERCENTAGE
         per_user = 0
-        author_name = inter.user.display_name
+        author_name = interaction.user.display_name
 
-        text = lang_manager.get_text("report_template", lang).format(
+        text = lang_manager.render("report_template", self.lang,
             name=contract["name"],
             amount=contract["amount"],
             leader=author_name,
@@ -167,125 +329,269 @@ async def report(interaction: discord.Interaction):
             per_user=f"{per_user:.2f}"
         )
 
-        view = discord.ui.View()
-        view.add_item(AddParticipantsButton(contract["name"], lang))
-        await inter.response.edit_message(content=text, embed=None, view=view)
+        view = discord.ui.View(timeout=None)
+        view.add_item(AddParticipantsButton(self.lang, contract_key(contract["name"])))
+        await respond_edit(interaction, content=text, embed=None, view=view)
+
+# --- Команда /report ---
+@bot.tree.command(name="report", description="📄 Отчёт по контракту")
+@app_commands.guild_only()
+@runner.command("report")
+async def report(interaction: discord.Interaction):
+    lang = await db.get_user_language(guild_of(interaction), interaction.user.id)
+    catalog = contracts.catalog(guild_of(interaction))
+    if not catalog:
+        await respond(interaction, lang_manager.get_text("no_contracts_found", lang), ephemeral=True)
+        return
 
-    view = ContractSelectView(contracts, lang, on_select)
-    await interaction.response.send_message(lang_manager.get_text("select_contract", lang), view=view, ephemeral=True)
+    view = discord.ui.View(timeout=None)
+    view.add_item(ContractSelect(lang, catalog.contracts))
+    await respond(interaction, lang_manager.get_text("select_contract", lang), view=view, ephemeral=True)
+
+# --- Постраничный вывод /reportdays ---
+class ReportDaysView(discord.ui.View):
+    """Страницы заработков участников: каждая страница запрашивается из БД по нажатию (keyset по имени)"""
+
+    def __init__(self, guild_id: int, days: int, since: datetime, until: datetime, summary: dict, lang: str):
+        super().__init__(timeout=300)
+        self.guild_id = guild_id
+        self.days = days
+        self.since = since
+        self.until = until
+        self.summary = summary
+        self.lang = lang
+        self.page = 1
+        self.rows = []
+        self.has_next = False
+        # Ключи первой и последней строки текущей страницы — курсоры для ◀ и ▶
+        self.first_key = None
+        self.last_key = None
+
+    async def load(self, page: int = 1, after: str = None, before: str = None) -> bool:
+        """
+        Загружает страницу page: после ключа after, перед ключом before или первую.
+        Если по курсору ничего нет (строки удалили между нажатиями через /cleanreportsday
+        или срок хранения), возвращает False и оставляет текущую страницу как есть.
+        """
+        page_size = Config.REPORT_DAYS_PAGE_SIZE
+        if before is not None:
+            rows = await db.get_participant_earnings_page(
+                self.guild_id, self.since, self.until, before=before, limit=page_size
+            )
+            has_next = True
+        else:
+            rows = await db.get_participant_earnings_page(
+                self.guild_id, self.since, self.until, after=after, limit=page_size + 1
+            )
+            has_next = len(rows) > page_size
+            rows = rows[:page_size]
+        if not rows and (after is not None or before is not None):
+            return False
+        self.page = page
+        self.rows = rows
+        self.has_next = has_next
+        self.first_key = rows[0]["key"] if rows else None
+        self.last_key = rows[-1]["key"] if rows else None
+        self.prev_button.disabled = page <= 1
+        self.next_button.disabled = not has_next
+        return True
+
+    async def turn(self, interaction: discord.Interaction, page: int, after: str = None, before: str = None):
+        # Курсора нет (страница пуста) или по нему ничего не нашлось — возвращаемся к первой странице
+        if (after is None and before is None) or not await self.load(page, after=after, before=before):
+            await self.load()
+        await respond_edit(interaction, embed=self.build_embed(), view=self)
+
+    def build_embed(self) -> discord.Embed:
+        earnings_text = "\n".join(f"• {r['key']}: {r['payout']:.2f} USD" for r in self.rows)
+        description = lang_manager.render("report_days_summary", self.lang,
+            days=self.days,
+            total=self.summary["total_amount"],
+            fund=self.summary["total_fund"],
+            payout=self.summary["total_payout"],
+            earnings=earnings_text
+        )
+        # Отчёты из очереди повторов уже подтверждены пользователям, но в БД их ещё нет
+        missing = db.retrying_reports_for(self.guild_id)
+        if missing:
+            description += "\n\n" + lang_manager.render("report_days_incomplete", self.lang, count=missing)
+        embed = discord.Embed(description=description)
+        embed.set_footer(text=lang_manager.render("report_days_page", self.lang, page=self.page))
+        return embed
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    @runner.command("reportdays_page")
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, self.page - 1, before=self.first_key)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    @runner.command("reportdays_page")
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, self.page + 1, after=self.last_key)
 
 # --- Команда /reportdays ---
 @bot.tree.command(name="reportdays", description="📅 Отчёт за последние дни (только для админов)")
+@app_commands.guild_only()
 @app_commands.describe(days="Количество дней для отчёта (максимум 30)")
+@runner.command("reportdays")
 async def report_days(interaction: discord.Interaction, days: int = Config.DEFAULT_REPORT_DAYS):
-    lang = db.get_user_language(interaction.user.id)
+    lang = await db.get_user_language(guild_of(interaction), interaction.user.id)
     if not interaction.user.guild_permissions.administrator:
-        await interaction.response.send_message(lang_manager.get_text("no_permission", lang), ephemeral=True)
+        await respond(interaction, lang_manager.get_text("no_permission", lang), ephemeral=True)
         return
 
     if days <= 0 or days > Config.MAX_REPORT_DAYS:
-        await interaction.response.send_message(f"❌ Введите число от 1 до {Config.MAX_REPORT_DAYS}.", ephemeral=True)
+        await respond(interaction, f"❌ Введите число от 1 до {Config.MAX_REPORT_DAYS}.", ephemeral=True)
         return
 
-    reports = db.get_reports_by_days(days)
-    if not reports:
-        await interaction.response.send_message(lang_manager.get_text("report_not_found", lang), ephemeral=True)
+    # Окно фиксируется при вызове, чтобы страницы не «плыли» от новых отчётов
+    until = datetime.now(timezone.utc)
+    since = until - timedelta(days=days)
+    summary = await db.summarize_reports(guild_of(interaction), since, until)
+    if not summary["reports"]:
+        text = lang_manager.get_text("report_not_found", lang)
+        missing = db.retrying_reports_for(guild_of(interaction))
+        if missing:
+            text += "\n\n" + lang_manager.render("report_days_incomplete", lang, count=missing)
+        await respond(interaction, text, ephemeral=True)
         return
 
-    total_amount = sum(r["amount"] for r in reports)
-    total_fund = sum(r["fund"] for r in reports)
-    total_payout = sum(r["per_user"] * len(r["participants"]) for r in reports)
-
-    earnings = {}
-    for r in reports:
-        for p in r["participants"]:
-            earnings[p] = earnings.get(p, 0) + r["per_user"]
-
-    earnings_text = "\n".join(f"• {user}: {amount:.2f} USD" for user, amount in earnings.items())
-
-    text = lang_manager.get_text("report_days_summary", lang).format(
-        days=days,
-        total=total_amount,
-        fund=total_fund,
-        payout=total_payout,
-        earnings=earnings_text
-    )
-    await interaction.response.send_message(text, ephemeral=True)
+    view = ReportDaysView(guild_of(interaction), days, since, until, summary, lang)
+    await view.load()
+    await respond(interaction, embed=view.build_embed(), view=view, ephemeral=True)
 
 # --- Команда /cleanreports ---
 @bot.tree.command(name="cleanreports", description="🧹 Удалить отчёты старше N дней (только админ)")
+@app_commands.guild_only()
 @app_commands.describe(days="Удалить отчёты старше этого количества дней")
+@runner.command("cleanreports")
 async def clean_reports(interaction: discord.Interaction, days: int = Config.REPORT_CLEANUP_DAYS):
-    lang = db.get_user_language(interaction.user.id)
+    lang = await db.get_user_language(guild_of(interaction), interaction.user.id)
     if not interaction.user.guild_permissions.administrator:
-        await interaction.response.send_message(lang_manager.get_text("no_permission", lang), ephemeral=True)
+        await respond(interaction, lang_manager.get_text("no_permission", lang), ephemeral=True)
         return
     if days <= 0 or days > Config.MAX_REPORT_DAYS:
-        await interaction.response.send_message(f"❌ Введите число от 1 до {Config.MAX_REPORT_DAYS}.", ephemeral=True)
+        await respond(interaction, f"❌ Введите число от 1 до {Config.MAX_REPORT_DAYS}.", ephemeral=True)
         return
 
-    count = db.delete_reports_older_than(days)
-    await interaction.response.send_message(
-        lang_manager.get_text("cleanreports_deleted", lang).format(count=count, date=f"{days} дн."),
+    count = await db.delete_reports_older_than(guild_of(interaction), days)
+    await respond(
+        interaction,
+        lang_manager.render("cleanreports_deleted", lang, count=count, date=f"{days} дн."),
         ephemeral=True
     )
 
 # --- Команда /cleanreportsday ---
 @bot.tree.command(name="cleanreportsday", description="🧹 Удалить отчёты за конкретный день (формат YYYY-MM-DD, только админ)")
+@app_commands.guild_only()
 @app_commands.describe(date="Дата в формате YYYY-MM-DD")
+@runner.command("cleanreportsday")
 async def clean_reports_day(interaction: discord.Interaction, date: str):
-    lang = db.get_user_language(interaction.user.id)
+    lang = await db.get_user_language(guild_of(interaction), interaction.user.id)
     if not interaction.user.guild_permissions.administrator:
-        await interaction.response.send_message(lang_manager.get_text("no_permission", lang), ephemeral=True)
+        await respond(interaction, lang_manager.get_text("no_permission", lang), ephemeral=True)
         return
 
     try:
         datetime.strptime(date, "%Y-%m-%d")
     except ValueError:
-        await interaction.response.send_message(lang_manager.get_text("invalid_date_format", lang), ephemeral=True)
+        await respond(interaction, lang_manager.get_text("invalid_date_format", lang), ephemeral=True)
         return
 
-    count = db.delete_reports_by_date(date)
-    await interaction.response.send_message(
-        lang_manager.get_text("cleanreportsday_deleted", lang).format(count=count, date=date),
+    count = await db.delete_reports_by_date(guild_of(interaction), date)
+    await respond(
+        interaction,
+        lang_manager.render("cleanreportsday_deleted", lang, count=count, date=date),
         ephemeral=True
     )
 
 # --- Команда /reload_contracts ---
 @bot.tree.command(name="reload_contracts", description="🔄 Перезагрузить контракты из файла (только админ)")
+@app_commands.guild_only()
+@runner.command("reload_contracts")
 async def reload_contracts(interaction: discord.Interaction):
-    lang = db.get_user_language(interaction.user.id)
+    lang = await db.get_user_language(guild_of(interaction), interaction.user.id)
     if not interaction.user.guild_permissions.administrator:
-        await interaction.response.send_message(lang_manager.get_text("no_permission", lang), ephemeral=True)
+        await respond(interaction, lang_manager.get_text("no_permission", lang), ephemeral=True)
+        return
+    remaining = contracts.cooldown_remaining(guild_of(interaction))
+    if remaining > 0:
+        await respond(
+            interaction,
+            lang_manager.render("contracts_reload_cooldown", lang, minutes=math.ceil(remaining / 60)),
+            ephemeral=True
+        )
         return
     try:
-        db.load_contracts_from_file(Config.CONTRACTS_JSON_PATH)
-        await interaction.response.send_message(lang_manager.get_text("contracts_reloaded", lang), ephemeral=True)
+        changes = await contracts.manual_reload(guild_of(interaction))
+        names = lambda items: ", ".join(items) if items else "—"
+        text = lang_manager.get_text("contracts_reloaded", lang) + "\n" + lang_manager.render(
+            "contracts_reload_changes", lang,
+            added=names(changes["added"]),
+            updated=names(changes["updated"]),
+            removed=names(changes["removed"])
+        )
+        await respond(interaction, text[:2000], ephemeral=True)
     except Exception as e:
-        await interaction.response.send_message(f"❌ Ошибка при загрузке контрактов: {e}", ephemeral=True)
+        await respond(interaction, f"❌ Ошибка при загрузке контрактов: {e}", ephemeral=True)
 
 # --- Команда /language ---
 @bot.tree.command(name="language", description="🌐 Сменить язык")
+@app_commands.guild_only()
+@runner.command("language")
 async def change_language(interaction: discord.Interaction):
-    lang = db.get_user_language(interaction.user.id)
+    lang = await db.get_user_language(guild_of(interaction), interaction.user.id)
 
     class LanguageView(discord.ui.View):
         @discord.ui.button(label=lang_manager.get_text("language_button_ru", lang), style=discord.ButtonStyle.primary)
+        @runner.command("language_select")
         async def ru_button(self, interaction_button: discord.Interaction, button: discord.ui.Button):
-            db.set_user_language(interaction.user.id, "ru")
-            await interaction_button.response.edit_message(content=lang_manager.get_text("language_set_ru", "ru"), view=None)
+            await db.set_user_language(guild_of(interaction), interaction.user.id, "ru")
+            await respond_edit(interaction_button, content=lang_manager.get_text("language_set_ru", "ru"), view=None)
 
         @discord.ui.button(label=lang_manager.get_text("language_button_ua", lang), style=discord.ButtonStyle.primary)
+        @runner.command("language_select")
         async def ua_button(self, interaction_button: discord.Interaction, button: discord.ui.Button):
-            db.set_user_language(interaction.user.id, "ua")
-            await interaction_button.response.edit_message(content=lang_manager.get_text("language_set_ua", "ua"), view=None)
+            await db.set_user_language(guild_of(interaction), interaction.user.id, "ua")
+            await respond_edit(interaction_button, content=lang_manager.get_text("language_set_ua", "ua"), view=None)
 
-    await interaction.response.send_message(lang_manager.get_text("select_language", lang), view=LanguageView(), ephemeral=True)
+    await respond(interaction, lang_manager.get_text("select_language", lang), view=LanguageView(), ephemeral=True)
+
+# --- Команда /stats ---
+@bot.tree.command(name="stats", description="📈 Задержки команд и ошибки (только админ)")
+@app_commands.guild_only()
+@runner.command("stats")
+async def stats(interaction: discord.Interaction):
+    lang = await db.get_user_language(guild_of(interaction), interaction.user.id)
+    if not interaction.user.guild_permissions.administrator:
+        await respond(interaction, lang_manager.get_text("no_permission", lang), ephemeral=True)
+        return
+
+    snapshot = instrumentation.snapshot()
+    if not snapshot:
+        await respond(interaction, lang_manager.get_text("stats_empty", lang), ephemeral=True)
+        return
+    lines = [
+        lang_manager.render("stats_line", lang,
+            command=name,
+            calls=row["calls"],
+            errors=int(row["errors"]),
+            misses=int(row["misses"]),
+            p50=f"{row['p50']:.0f}",
+            p95=f"{row['p95']:.0f}",
+            db=f"{row['db']:.1f}",
+            discord=f"{row['discord']:.1f}",
+            render=f"{row['render']:.2f}"
+        )
+        for name, row in sorted(snapshot.items())
+    ]
+    await respond(interaction, "\n".join(lines)[:2000], ephemeral=True)
 
 # --- Команда /info ---
 @bot.tree.command(name="info", description="ℹ️ Информация о командах")
+@runner.command("info")
 async def info(interaction: discord.Interaction):
-    lang = db.get_user_language(interaction.user.id)
+    lang = await db.get_user_language(guild_of(interaction), interaction.user.id)
     text = (
         "📌 **Команды Castello Bot:**\n\n"
         "/language — Сменить язык (RU / UA)\n"
@@ -294,21 +600,29 @@ async def info(interaction: discord.Interaction):
         "/cleanreports — Удалить старые отчёты (только админ)\n"
         "/cleanreportsday — Удалить отчёты за конкретный день (только админ)\n"
         "/reload_contracts — Перезагрузить контракты из файла (только админ)\n"
+        "/stats — Задержки команд и ошибки (только админ)\n"
         "/info — Информация о командах\n\n"
         "В отчёте есть кнопка ➕ Добавить участников.\n"
         "После добавления отчёт сохраняется в базу."
     )
-    await interaction.response.send_message(text, ephemeral=True)
+    await respond(interaction, text, ephemeral=True)
 
+# on_ready повторяется после каждого переподключения без resume, поэтому здесь ничего тяжёлого
 @bot.event
 async def on_ready():
-    await bot.tree.sync()
-    print(f"✅ Бот запущен как {bot.user}")
+    if startup.mark("ready"):
+        print(f"✅ Бот запущен как {bot.user} за {startup.marks['ready']:.2f} с")
+    else:
+        print(f"🔁 Переподключение к gateway как {bot.user}")
+
+startup.mark("imported")
 
 if __name__ == "__main__":
-    keep_alive()
     token = Config.DISCORD_BOT_TOKEN
     if not token:
         print("❌ DISCORD_BOT_TOKEN не установлен.")
         exit(1)
-    bot.run(token)
+    try:
+        bot.run(token)
+    finally:
+        db.close()
@@ -0,0 +1,69 @@
+"""
+Служебные команды обслуживания базы.
+
+    python manage.py rebuild-rollups    — пересчитать дневные итоги по всем отчётам
+    python manage.py maintain           — архивировать холодные месяцы, ANALYZE и VACUUM
+    python manage.py retention DAYS     — удалить отчёты всех серверов старше DAYS дней
+    python manage.py assign-legacy-guild GUILD_ID
+                                        — отдать серверу отчёты, сохранённые до поддержки нескольких серверов
+"""
+import argparse
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from core.database_sqlite import DatabaseManager
+from config import Config
+
+
+def rebuild_rollups(db: DatabaseManager, args) -> None:
+    days = db.rebuild_rollups()
+    print(f"✅ Дневные итоги пересчитаны: {days} дн.")
+
+
+def maintain(db: DatabaseManager, args) -> None:
+    result = db.maintain(args.archive_after_months, args.vacuum_threshold)
+    print(f"✅ В архив: {', '.join(result['archived']) or '—'}")
+    print(f"✅ Удалено из архива: {', '.join(result['dropped']) or '—'}")
+    print(f"✅ VACUUM: {', '.join(result['vacuumed']) or '—'}")
+
+
+def retention(db: DatabaseManager, args) -> None:
+    if args.days <= 0:
+        raise SystemExit("❌ DAYS должно быть больше нуля")
+    count = db.delete_reports_older_than(None, args.days)
+    print(f"✅ Удалено отчётов старше {args.days} дн.: {count}")
+
+
+def assign_legacy_guild(db: DatabaseManager, args) -> None:
+    count = db.assign_legacy_guild(args.guild_id)
+    print(f"✅ Отчётов перенесено на сервер {args.guild_id}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обслуживание базы Castello Bot")
+    parser.add_argument("--db", default=Config.DATABASE_PATH, help="путь к файлу базы")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild-rollups", help="пересчитать дневные итоги").set_defaults(func=rebuild_rollups)
+    maintain_parser = commands.add_parser("maintain", help="архивирование, ANALYZE и VACUUM")
+    maintain_parser.add_argument("--archive-after-months", type=int, default=Config.REPORT_ARCHIVE_AFTER_MONTHS)
+    maintain_parser.add_argument("--vacuum-threshold", type=float, default=0.2,
+                                 help="доля свободных страниц, начиная с которой делается VACUUM")
+    maintain_parser.set_defaults(func=maintain)
+    retention_parser = commands.add_parser("retention", help="удалить отчёты всех серверов старше DAYS дней")
+    retention_parser.add_argument("days", type=int)
+    retention_parser.set_defaults(func=retention)
+    legacy_parser = commands.add_parser("assign-legacy-guild", help="отдать серверу отчёты без guild_id")
+    legacy_parser.add_argument("guild_id", type=int)
+    legacy_parser.set_defaults(func=assign_legacy_guild)
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db)
+    try:
+        args.func(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
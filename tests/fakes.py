@@ -0,0 +1,126 @@
+"""
+Общие подделки для тестов и бенчмарков: объекты Discord, которые обработчики берут
+из discord.Interaction (сетевые вызовы — sleep(latency) или ничего), и случайный отчёт.
+"""
+import asyncio
+import random
+from datetime import datetime, timezone
+
+import discord
+
+GUILD_ID = 1
+
+
+def make_report(rnd: random.Random) -> dict:
+    participants = [f"user{rnd.randint(1, 500)}" for _ in range(rnd.randint(1, 6))]
+    return {
+        "guild_id": GUILD_ID,
+        "contract_name": f"Контракт {rnd.randint(1, 11)}",
+        "author_id": rnd.randint(1, 500),
+        "author_name": f"user{rnd.randint(1, 500)}",
+        "participants": participants,
+        "participant_ids": [int(name[4:]) for name in participants],
+        "amount": 100000,
+        "fund": 50000,
+        "per_user": 50000 / len(participants),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+
+def break_writes(db, failures: int) -> None:
+    """Первые failures попыток записи (пачкой и по одному) падают, как при занятом диске"""
+    writer = db._writer_db
+    save_reports, save_report = writer.save_reports, writer.save_report
+    left = [failures]
+
+    def failing(method):
+        def wrapper(*args):
+            if left[0] > 0:
+                left[0] -= 1
+                raise OSError("disk I/O error")
+            return method(*args)
+        return wrapper
+
+    writer.save_reports = failing(save_reports)
+    writer.save_report = failing(save_report)
+
+
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self, method: str, **kwargs):
+        # Как в discord.py: второй ответ через interaction.response — ошибка
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        self._done = True
+        self._interaction.calls.append((method, kwargs))
+        await self._interaction.network()
+
+    async def send_message(self, content=None, **kwargs):
+        await self._respond("response.send_message", content=content, **kwargs)
+        self._interaction.replies.append((content, kwargs))
+
+    async def edit_message(self, content=None, **kwargs):
+        await self._respond("response.edit_message", content=content, **kwargs)
+        self._interaction.replies.append((content, kwargs))
+
+    async def defer(self, **kwargs):
+        await self._respond("response.defer", **kwargs)
+
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        self._interaction.calls.append(("followup.send", dict(content=content, **kwargs)))
+        await self._interaction.network()
+        self._interaction.replies.append((content, kwargs))
+
+
+class FakeChannel:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent += 1
+
+
+class FakeInteraction:
+    """То, что обработчики берут из discord.Interaction; сетевые вызовы — sleep(latency) или ничего"""
+
+    def __init__(self, user, channel: FakeChannel, latency: float, component: bool = False):
+        self.user = user
+        self.guild_id = GUILD_ID
+        self.channel = channel
+        self.created_at = datetime.now(timezone.utc)
+        self.type = discord.InteractionType.component if component else discord.InteractionType.application_command
+        self.latency = latency
+        self.replies = []
+        # (метод, аргументы) каждого обращения к Discord API — для проверок в tests/
+        self.calls = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def network(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def edit_original_response(self, content=None, **kwargs):
+        self.calls.append(("edit_original_response", dict(content=content, **kwargs)))
+        await self.network()
+        self.replies.append((content, kwargs))
+
+    def last_view(self):
+        for _, kwargs in reversed(self.replies):
+            if kwargs.get("view") is not None:
+                return kwargs["view"]
+        return None
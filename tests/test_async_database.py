@@ -0,0 +1,66 @@
+import asyncio
+import os
+import random
+
+from core.async_database import AsyncDatabaseManager
+from tests.fakes import break_writes, make_report
+
+
+async def count_reports(db: AsyncDatabaseManager) -> int:
+    return len(await db.get_reports_by_days(1, 1))
+
+
+def test_failed_reports_are_retried_with_backoff(tmp_path):
+    async def scenario():
+        db = AsyncDatabaseManager(str(tmp_path / "db.sqlite"), readers=1, retry_delay=0.05)
+        await db.start()
+        try:
+            # Пачка и оба отчёта по одному, затем первый повтор пачки
+            break_writes(db, 4)
+            rnd = random.Random(1)
+            for _ in range(2):
+                await db.save_report(make_report(rnd))
+            await db.flush()
+            assert db.retrying_reports == 2
+            assert db.retrying_reports_for(1) == 2
+            assert db.retrying_reports_for(2) == 0
+            assert db.queue_depth == 2
+            assert db.failed_writes == 2
+            assert await count_reports(db) == 0
+
+            await asyncio.sleep(0.3)
+            assert db.retrying_reports == 0
+            assert await count_reports(db) == 2
+        finally:
+            await db.aclose()
+            db.close()
+
+    asyncio.run(scenario())
+
+
+def test_unsaved_reports_survive_restart(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def fail_until_close():
+        db = AsyncDatabaseManager(path, readers=1, retry_delay=60)
+        await db.start()
+        break_writes(db, 1000)
+        await db.save_report(make_report(random.Random(2)))
+        await db.aclose()
+        db.close()
+        return db.unsaved_path
+
+    async def restart():
+        db = AsyncDatabaseManager(path, readers=1, retry_delay=0.01)
+        await db.start()
+        try:
+            await asyncio.sleep(0.1)
+            return await count_reports(db), db.queue_depth
+        finally:
+            await db.aclose()
+            db.close()
+
+    unsaved_path = asyncio.run(fail_until_close())
+    assert os.path.exists(unsaved_path)
+    assert asyncio.run(restart()) == (1, 0)
+    assert not os.path.exists(unsaved_path)
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import pytest
+
+from core.async_database import AsyncDatabaseManager
+from core.contracts import ContractRegistry
+from core.database_sqlite import LEGACY_GUILD_ID
+
+OWN_GUILD = 111
+SHARED_GUILD = 222
+
+
+def write_catalog(path, *names) -> None:
+    path.write_text(json.dumps([{"name": name, "amount": 1000} for name in names]), encoding="utf-8")
+
+
+def run_with_registry(tmp_path, scenario):
+    shared = tmp_path / "contracts.json"
+    guild_dir = tmp_path / "contracts"
+    guild_dir.mkdir()
+    write_catalog(shared, "Общий")
+    write_catalog(guild_dir / f"{OWN_GUILD}.json", "Свой")
+
+    async def main():
+        db = AsyncDatabaseManager(str(tmp_path / "db.sqlite"), readers=1)
+        await db.start()
+        try:
+            registry = ContractRegistry(db, str(shared), str(guild_dir), cooldown_minutes=10)
+            await registry.load()
+            await scenario(registry, shared, guild_dir)
+        finally:
+            await db.aclose()
+            db.close()
+
+    asyncio.run(main())
+
+
+def test_cooldown_is_keyed_on_reloaded_catalog(tmp_path):
+    async def scenario(registry, shared, guild_dir):
+        await registry.manual_reload(SHARED_GUILD)
+        # Общий каталог перезагружен: кулдаун у всех серверов без своего файла
+        assert registry.cooldown_remaining(SHARED_GUILD) > 0
+        assert registry.cooldown_remaining(333) > 0
+        assert registry.cooldown_remaining(OWN_GUILD) == 0
+        assert set(registry._last_reload) == {LEGACY_GUILD_ID}
+
+        await registry.manual_reload(OWN_GUILD)
+        assert registry.cooldown_remaining(OWN_GUILD) > 0
+        assert set(registry._last_reload) == {LEGACY_GUILD_ID, OWN_GUILD}
+
+    run_with_registry(tmp_path, scenario)
+
+
+def test_failed_reload_does_not_start_cooldown(tmp_path):
+    async def scenario(registry, shared, guild_dir):
+        shared.write_text("{не json", encoding="utf-8")
+        with pytest.raises(ValueError):
+            await registry.manual_reload(SHARED_GUILD)
+        assert registry.cooldown_remaining(SHARED_GUILD) == 0
+
+        write_catalog(shared, "Общий", "Новый")
+        changes = await registry.manual_reload(SHARED_GUILD)
+        assert changes["added"] == ["Новый"]
+        assert registry.cooldown_remaining(SHARED_GUILD) > 0
+
+    run_with_registry(tmp_path, scenario)
+
+
+def test_removed_guild_file_falls_back_to_shared_catalog(tmp_path):
+    async def scenario(registry, shared, guild_dir):
+        assert registry.get(OWN_GUILD, "Свой") is not None
+        (guild_dir / f"{OWN_GUILD}.json").unlink()
+        await registry.manual_reload(OWN_GUILD)
+        assert registry.get(OWN_GUILD, "Свой") is None
+        assert registry.get(OWN_GUILD, "Общий") is not None
+        assert set(registry._last_reload) == {LEGACY_GUILD_ID}
+
+    run_with_registry(tmp_path, scenario)
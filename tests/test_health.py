@@ -0,0 +1,55 @@
+import main
+
+
+class FakeShard:
+    def __init__(self, latency, closed=False):
+        self.latency = latency
+        self.closed = closed
+
+    def is_closed(self):
+        return self.closed
+
+
+class FakeBot:
+    def __init__(self, *shards):
+        self.shards = dict(enumerate(shards))
+        latencies = [shard.latency for shard in shards]
+        self.latency = sum(latencies) / len(latencies) if latencies else float("nan")
+
+    def is_closed(self):
+        return False
+
+    def is_ready(self):
+        return True
+
+
+def status(monkeypatch, bot):
+    monkeypatch.setattr(main, "bot", bot)
+    return main.health_status()
+
+
+def test_ok_when_all_shards_alive(monkeypatch):
+    health = status(monkeypatch, FakeBot(FakeShard(0.05), FakeShard(0.07)))
+    assert health["status"] == "ok"
+    assert health["gateway_shard_latency_ms"] == {"0": 50.0, "1": 70.0}
+
+
+def test_degraded_when_shard_closed(monkeypatch):
+    # is_ready() остаётся True, средняя задержка по живому шарду в норме
+    health = status(monkeypatch, FakeBot(FakeShard(0.05), FakeShard(0.05, closed=True)))
+    assert health["status"] == "degraded"
+    assert health["gateway_shard_latency_ms"]["1"] is None
+
+
+def test_degraded_on_slow_or_missing_heartbeat(monkeypatch):
+    slow = main.Config.HEALTH_MAX_GATEWAY_LATENCY_SECONDS + 1
+    assert status(monkeypatch, FakeBot(FakeShard(0.05), FakeShard(slow)))["status"] == "degraded"
+    assert status(monkeypatch, FakeBot(FakeShard(float("inf"))))["status"] == "degraded"
+    assert status(monkeypatch, FakeBot())["status"] == "degraded"
+
+
+def test_shard_latency_gauge(monkeypatch):
+    monkeypatch.setattr(main, "bot", FakeBot(FakeShard(0.05), FakeShard(0.05, closed=True)))
+    lines = [line for line in main.metrics.render().splitlines()
+             if line.startswith("castello_gateway_shard_latency_seconds{")]
+    assert lines == ['castello_gateway_shard_latency_seconds{shard="0"} 0.05']
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from core.instrumentation import Instrumentation
+from core.language import CATALOG_SCHEMA, LanguageManager, Template
+from core.metrics import MetricsRegistry
+
+
+def test_render_matches_str_format():
+    text = "{name!r} — {amount:,.2f} USD, {share:>6} {note!s}{{буквально}} кінець"
+    values = {"name": "Контракт", "amount": 165000.5, "share": "50%", "note": None}
+    template = Template("sample", text)
+    assert template.fields == {"name", "amount", "share", "note"}
+    assert template.render(values) == text.format(**values)
+
+
+def test_catalog_renders_like_str_format():
+    manager = LanguageManager()
+    for (lang, key), template in manager.catalog.items():
+        values = {field: f"<{field}>" for field in CATALOG_SCHEMA[key]}
+        assert manager.render(key, lang, **values) == template.text.format(**values)
+
+
+@pytest.mark.parametrize("text", [
+    "{0}",
+    "{}",
+    "{user.name}",
+    "{items[0]}",
+    "{amount:{width}}",
+    "{name!x}",
+    "незакрита {name",
+    "зайва }",
+    "{__import__('os')}",
+])
+def test_invalid_placeholders_fail_at_load(text):
+    with pytest.raises(ValueError, match="Ключ «bad»"):
+        Template("bad", text)
+
+
+def test_render_time_is_recorded_only_inside_a_command():
+    manager = LanguageManager()
+    instrumentation = Instrumentation(MetricsRegistry())
+    values = {"page": 2}
+
+    @instrumentation.track("reportdays_page")
+    async def handler():
+        return manager.render("report_days_page", "ua", **values)
+
+    assert manager.render("report_days_page", "ua", **values) == asyncio.run(handler())
+    assert instrumentation.phase_duration.count(command="reportdays_page", phase="render") == 1
+    assert instrumentation.phase_duration.mean(command="reportdays_page", phase="render") > 0
@@ -0,0 +1,40 @@
+import os
+import random
+import subprocess
+import sys
+from datetime import datetime, timezone, timedelta
+
+from core.database_sqlite import DatabaseManager
+from tests.fakes import make_report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_retention_drops_old_reports_of_all_guilds(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+    now = datetime.now(timezone.utc)
+    rnd = random.Random(3)
+    db = DatabaseManager(path)
+    try:
+        for guild_id in (1, 2):
+            for days_ago in (1, 10, 45, 100, 200):
+                report = make_report(rnd)
+                report["guild_id"] = guild_id
+                report["timestamp"] = (now - timedelta(days=days_ago)).isoformat()
+                db.save_report(report)
+    finally:
+        db.close()
+
+    output = subprocess.run(
+        [sys.executable, "manage.py", "--db", path, "retention", "30"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    assert "Удалено отчётов старше 30 дн.: 6" in output
+
+    db = DatabaseManager(path)
+    try:
+        for guild_id in (1, 2):
+            assert len(db.get_reports_by_days(guild_id, 365)) == 2
+            assert db.summarize_reports(guild_id, now - timedelta(days=365))["reports"] == 2
+    finally:
+        db.close()
@@ -0,0 +1,85 @@
+import asyncio
+import random
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+
+import main
+from core.async_database import AsyncDatabaseManager
+from tests.fakes import GUILD_ID, FakeChannel, FakeInteraction, break_writes, make_report
+
+PAGE_SIZE = 3
+USER = SimpleNamespace(id=1, display_name="admin")
+
+
+def keys(view):
+    return [row["key"] for row in view.rows]
+
+
+def run_view(tmp_path, monkeypatch, scenario):
+    monkeypatch.setattr(main.Config, "REPORT_DAYS_PAGE_SIZE", PAGE_SIZE)
+
+    async def run():
+        db = AsyncDatabaseManager(str(tmp_path / "db.sqlite"), readers=1)
+        await db.start()
+        monkeypatch.setattr(main, "db", db)
+        try:
+            rnd = random.Random(7)
+            for _ in range(20):
+                await db.save_report(make_report(rnd))
+            until = datetime.now(timezone.utc) + timedelta(seconds=1)
+            since = until - timedelta(days=1)
+            summary = await db.summarize_reports(GUILD_ID, since, until)
+            view = main.ReportDaysView(GUILD_ID, 1, since, until, summary, "ru")
+            await view.load()
+            await scenario(db, view)
+        finally:
+            await db.aclose()
+            db.close()
+
+    asyncio.run(run())
+
+
+async def press(button):
+    interaction = FakeInteraction(USER, FakeChannel(0), 0, component=True)
+    await button.callback(interaction)
+    return interaction
+
+
+def test_pages_move_forward_and_back(tmp_path, monkeypatch):
+    async def scenario(db, view):
+        first = keys(view)
+        await press(view.next_button)
+        assert view.page == 2 and keys(view) > first
+        await press(view.prev_button)
+        assert view.page == 1 and keys(view) == first
+        assert view.prev_button.disabled
+
+    run_view(tmp_path, monkeypatch, scenario)
+
+
+def test_deleted_rows_between_clicks_return_to_first_page(tmp_path, monkeypatch):
+    async def scenario(db, view):
+        await press(view.next_button)
+        assert view.page == 2
+        today = datetime.now(timezone.utc).date().isoformat()
+        await db.delete_reports_by_date(GUILD_ID, today)
+
+        for button in (view.next_button, view.prev_button, view.prev_button):
+            interaction = await press(button)
+            assert view.page == 1 and view.rows == []
+            assert view.prev_button.disabled and view.next_button.disabled
+            assert [method for method, _ in interaction.calls] == ["response.edit_message"]
+
+    run_view(tmp_path, monkeypatch, scenario)
+
+
+def test_summary_is_marked_incomplete_while_reports_wait_for_retry(tmp_path, monkeypatch):
+    async def scenario(db, view):
+        assert "⚠️" not in view.build_embed().description
+        db.retry_delay = 3600
+        break_writes(db, 2)
+        await db.save_report(make_report(random.Random(8)))
+        await db.flush()
+        assert "Ещё не записано в базу отчётов: 1" in view.build_embed().description
+
+    run_view(tmp_path, monkeypatch, scenario)
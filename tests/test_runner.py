@@ -0,0 +1,118 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.instrumentation import Instrumentation, respond, respond_edit
+from core.metrics import MetricsRegistry
+from core.runner import CommandRunner
+from tests.fakes import FakeChannel, FakeInteraction
+
+DEFER_AFTER = 0.05
+USER = SimpleNamespace(id=1, display_name="tester")
+
+
+class SlowStorage:
+    """Хранилище, которое отвечает дольше порога defer"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def get_reports_by_days(self, guild_id: int, days: int):
+        await asyncio.sleep(self.delay)
+        return []
+
+
+def make_runner(**kwargs) -> CommandRunner:
+    return CommandRunner(Instrumentation(MetricsRegistry()), defer_after=DEFER_AFTER, **kwargs)
+
+
+def interaction(latency: float = 0.0, component: bool = False) -> FakeInteraction:
+    return FakeInteraction(USER, FakeChannel(0), latency, component=component)
+
+
+def methods(interaction: FakeInteraction):
+    return [method for method, _ in interaction.calls]
+
+
+def test_slow_storage_defers_once_then_followup():
+    runner = make_runner()
+    storage = SlowStorage(DEFER_AFTER * 4)
+
+    @runner.command("reportdays")
+    async def handler(interaction):
+        reports = await storage.get_reports_by_days(interaction.guild_id, 7)
+        await respond(interaction, f"{len(reports)} отчётов")
+
+    target = interaction()
+    asyncio.run(handler(target))
+
+    assert methods(target) == ["response.defer", "followup.send"]
+    assert target.calls[0][1] == {"ephemeral": True, "thinking": True}
+    assert runner.deferrals.value(command="reportdays") == 1
+
+
+@pytest.mark.parametrize("offset", [-0.01, -0.002, 0.0, 0.002, 0.01])
+def test_reply_racing_deferral_answers_once(offset):
+    runner = make_runner()
+
+    @runner.command("race")
+    async def handler(interaction):
+        await asyncio.sleep(DEFER_AFTER + offset)
+        await respond(interaction, "готово")
+
+    # Задержка сети держит defer «в полёте», пока обработчик пытается ответить
+    target = interaction(latency=0.02)
+    asyncio.run(handler(target))
+
+    first, *rest = methods(target)
+    assert first in ("response.defer", "response.send_message")
+    assert all(method == "followup.send" for method in rest)
+    assert len(target.replies) == 1
+    assert runner.deferrals.value(command="race") == (first == "response.defer")
+
+
+def test_component_defers_update_then_edits_original():
+    runner = make_runner()
+
+    @runner.command("reportdays_page")
+    async def handler(interaction):
+        await asyncio.sleep(DEFER_AFTER * 4)
+        await respond_edit(interaction, content="страница 2")
+
+    target = interaction(component=True)
+    asyncio.run(handler(target))
+
+    assert methods(target) == ["response.defer", "edit_original_response"]
+    assert target.calls[0][1] == {}
+    assert target.calls[1][1]["content"] == "страница 2"
+
+
+def test_fast_handler_is_not_deferred():
+    runner = make_runner()
+
+    @runner.command("info")
+    async def handler(interaction):
+        await respond(interaction, "информация")
+
+    target = interaction()
+    asyncio.run(handler(target))
+
+    assert methods(target) == ["response.send_message"]
+    assert runner.deferrals.value(command="info") == 0
+
+
+def test_slow_command_by_p95_is_deferred_immediately():
+    runner = make_runner(min_samples=3)
+    for _ in range(3):
+        runner.instrumentation.duration.observe(DEFER_AFTER * 10, command="stats")
+
+    @runner.command("stats")
+    async def handler(interaction):
+        await asyncio.sleep(DEFER_AFTER / 5)
+        await respond(interaction, "статистика")
+
+    target = interaction()
+    asyncio.run(handler(target))
+
+    assert methods(target) == ["response.defer", "followup.send"]
@@ -0,0 +1,76 @@
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from core.database_sqlite import DatabaseManager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Процесс бота без подключения к gateway: как Client.run, но вместо start() ждёт закрытия
+CHILD = textwrap.dedent("""
+    import asyncio
+    import random
+    import sys
+
+    import main
+    from tests.fakes import break_writes, make_report
+
+    async def run(mode):
+        async with main.bot:
+            await main.bot.setup_hook()
+            if mode == "pending":
+                main.db.flush_delay = 3600
+            else:
+                # Пачка и отчёт по одному падают, отчёт уходит в очередь повторов
+                main.db.retry_delay = 3600
+                break_writes(main.db, 2 if mode == "retrying" else 10 ** 6)
+            await main.db.save_report(make_report(random.Random(5)))
+            if mode != "pending":
+                await main.db.flush()
+            print(f"queued {main.db.queue_depth}", flush=True)
+            while not main.bot.is_closed():
+                await asyncio.sleep(0.05)
+
+    try:
+        asyncio.run(run(sys.argv[1]))
+    finally:
+        main.db.close()
+""")
+
+
+@pytest.mark.parametrize("mode, saved, unsaved", [
+    ("pending", 1, 0),
+    ("retrying", 1, 0),
+    ("failing", 0, 1),
+])
+def test_sigterm_keeps_queued_reports(tmp_path, mode, saved, unsaved):
+    path = str(tmp_path / "db.sqlite")
+    env = dict(os.environ, DATABASE_PATH=path, PORT="0")
+    child = subprocess.Popen(
+        [sys.executable, "-c", CHILD, mode], cwd=ROOT, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    try:
+        line = child.stdout.readline()
+        while line and not line.startswith("queued"):
+            line = child.stdout.readline()
+        assert line.strip() == "queued 1", child.stderr.read()
+        child.send_signal(signal.SIGTERM)
+        child.wait(timeout=30)
+    finally:
+        if child.poll() is None:
+            child.kill()
+    assert child.returncode == 0, child.stderr.read()
+
+    db = DatabaseManager(path)
+    try:
+        assert len(db.get_reports_by_days(1, 1)) == saved
+    finally:
+        db.close()
+    unsaved_path = f"{path}.unsaved.jsonl"
+    lines = open(unsaved_path, encoding="utf-8").read().splitlines() if os.path.exists(unsaved_path) else []
+    assert len(lines) == unsaved
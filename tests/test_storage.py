@@ -0,0 +1,26 @@
+import asyncio
+import os
+
+import pytest
+
+from benchmarks.check_storage import reset_postgres, run_backend
+from core.async_database import AsyncDatabaseManager
+
+# Пустая база PostgreSQL для проверки бэкенда (таблицы пересоздаются), например
+# TEST_DATABASE_URL=postgresql://localhost/castello_test
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def test_sqlite_matches_reference(tmp_path):
+    db = AsyncDatabaseManager(str(tmp_path / "check.sqlite"), batch_size=16)
+    checker = asyncio.run(run_backend("sqlite", db, str(tmp_path), 500, 42))
+    assert checker.failures == 0
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL не задан")
+def test_postgres_matches_reference(tmp_path):
+    from core.database_postgres import PostgresStorage
+
+    asyncio.run(reset_postgres(TEST_DATABASE_URL))
+    checker = asyncio.run(run_backend("postgres", PostgresStorage(TEST_DATABASE_URL), str(tmp_path), 500, 42))
+    assert checker.failures == 0